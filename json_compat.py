@@ -0,0 +1,34 @@
+"""
+JSON読み書きヘルパー (json_compat.py)
+
+orjson がインストールされていれば使用し、なければ標準の json にフォールバックする
+（pip install orjson で高速化）
+
+- json_loads: bytes / str をパース
+- json_dumps: インデント付き・UTF-8 の bytes に変換
+- json_dumps_compact: 改行・空白なしの UTF-8 bytes に変換（APIリクエストの本文用）
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+    
+    def json_loads(data) -> Any:
+        return orjson.loads(data)
+    
+    def json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    
+    def json_dumps_compact(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def json_loads(data) -> Any:
+        return json.loads(data)
+    
+    def json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    
+    def json_dumps_compact(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
@@ -14,14 +14,18 @@ CustomTkinterを使用したダークモードのスタイリッシュなデザ
 - 自動同期設定の保存・復元
 """
 
-import json
+import functools
+import heapq
 import sys
 import os
+import queue
 import threading
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 
 # CustomTkinterのインストールチェック
 try:
@@ -41,9 +45,55 @@ from tkinter import messagebox
 # 現在のスクリプトのディレクトリをパスに追加
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from topstepx_client import TopstepXClient
-from notion_client import NotionRoundtripClient, load_credentials
-from roundtrip_transformer import RoundtripTransformer
+# 設定ファイルの読み書き（orjson があれば使用）
+from json_compat import json_loads, json_dumps
+
+# APIクライアント類（requests等を含む）は初回使用時に読み込み、起動を速くする
+if TYPE_CHECKING:
+    from topstepx_client import TopstepXClient
+    from notion_client import NotionRoundtripClient
+    from roundtrip_transformer import RoundtripTransformer
+
+
+# 接続テストのタイムアウト (接続, 読み込み) 秒
+CONNECTION_TEST_TIMEOUT = (3, 10)
+
+
+def _apply_default_timeout(session, timeout=CONNECTION_TEST_TIMEOUT):
+    """セッションの全リクエストに既定のタイムアウトを設定（個別指定があればそちらを優先）"""
+    session.request = functools.partial(session.request, timeout=timeout)
+    return session
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_http_session():
+    """接続テスト用の共有HTTPセッション（keep-aliveで接続を再利用する）"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=1))
+    return _apply_default_timeout(session)
+
+
+# ログ用タイムスタンプのキャッシュ [秒, "HH:MM:SS"]（同じ秒の間は再フォーマットしない）
+_TS_CACHE = [0, ""]
+
+# 共有フォント (size, weight, family) -> CTkFont（Tkのルート作成後、最初の使用時に生成）
+_FONT_POOL: Dict[tuple, "ctk.CTkFont"] = {}
+
+
+def get_font(size: int, weight: str = "normal", family: Optional[str] = None) -> "ctk.CTkFont":
+    """同じスタイルのフォントを1つのTkフォントとして共有する"""
+    key = (size, weight, family)
+    font = _FONT_POOL.get(key)
+    if font is None:
+        if family:
+            font = ctk.CTkFont(family=family, size=size, weight=weight)
+        else:
+            font = ctk.CTkFont(size=size, weight=weight)
+        _FONT_POOL[key] = font
+    return font
 
 
 # カラーテーマ
@@ -80,15 +130,15 @@ class Theme:
 class ModernButton(ctk.CTkButton):
     """モダンなボタンコンポーネント"""
     
+    _VARIANT_COLORS = {
+        "primary": (Theme.PRIMARY, Theme.PRIMARY_HOVER),
+        "secondary": (Theme.SECONDARY, Theme.SECONDARY_HOVER),
+        "danger": (Theme.DANGER, "#b62324"),
+        "ghost": (Theme.BG_CARD, Theme.BORDER),
+    }
+    
     def __init__(self, master, variant="primary", **kwargs):
-        colors = {
-            "primary": (Theme.PRIMARY, Theme.PRIMARY_HOVER),
-            "secondary": (Theme.SECONDARY, Theme.SECONDARY_HOVER),
-            "danger": (Theme.DANGER, "#b62324"),
-            "ghost": (Theme.BG_CARD, Theme.BORDER),
-        }
-        
-        fg_color, hover_color = colors.get(variant, colors["primary"])
+        fg_color, hover_color = self._VARIANT_COLORS.get(variant, self._VARIANT_COLORS["primary"])
         
         # heightが指定されていなければデフォルト値を使用
         if "height" not in kwargs:
@@ -100,7 +150,7 @@ class ModernButton(ctk.CTkButton):
             hover_color=hover_color,
             corner_radius=8,
             border_width=0,
-            font=ctk.CTkFont(size=13, weight="bold"),
+            font=get_font(13, "bold"),
             **kwargs
         )
 
@@ -122,7 +172,7 @@ class ModernCard(ctk.CTkFrame):
             self.title_label = ctk.CTkLabel(
                 self,
                 text=title,
-                font=ctk.CTkFont(size=14, weight="bold"),
+                font=get_font(14, "bold"),
                 text_color=Theme.TEXT_PRIMARY,
                 anchor="w"
             )
@@ -139,6 +189,14 @@ class ModernCard(ctk.CTkFrame):
 class StatusBadge(ctk.CTkFrame):
     """ステータスバッジ"""
     
+    _STATUS_COLORS = {
+        "success": Theme.SUCCESS,
+        "error": Theme.ERROR,
+        "warning": Theme.WARNING,
+        "info": Theme.INFO,
+        "muted": Theme.TEXT_MUTED
+    }
+    
     def __init__(self, master, text="", status="info", **kwargs):
         super().__init__(
             master,
@@ -158,32 +216,38 @@ class StatusBadge(ctk.CTkFrame):
         self.label = ctk.CTkLabel(
             self,
             text=text,
-            font=ctk.CTkFont(size=13),
+            font=get_font(13),
             text_color=Theme.TEXT_SECONDARY
         )
         self.label.pack(side="left")
     
-    def set_status(self, text, status="info"):
-        colors = {
-            "success": Theme.SUCCESS,
-            "error": Theme.ERROR,
-            "warning": Theme.WARNING,
-            "info": Theme.INFO,
-            "muted": Theme.TEXT_MUTED
-        }
+    def set_status(self, text, status="info", _colors=_STATUS_COLORS, _default=Theme.TEXT_MUTED):
         self.label.configure(text=text)
-        self.indicator.configure(fg_color=colors.get(status, Theme.TEXT_MUTED))
+        self.indicator.configure(fg_color=_colors.get(status, _default))
 
 
 class LogDisplay(ctk.CTkTextbox):
     """モダンなログ表示"""
     
+    # 保持する最大行数（超えた分は古い行から削除）
+    MAX_LINES = 1000
+    
+    # ログレベル（タグ名）ごとの文字色
+    _TAG_COLORS = {
+        "success": Theme.SUCCESS,
+        "error": Theme.ERROR,
+        "warning": Theme.WARNING,
+        "info": Theme.TEXT_SECONDARY,
+        "auto": Theme.INFO,
+        "timestamp": Theme.TEXT_MUTED,
+    }
+    
     def __init__(self, master, **kwargs):
         super().__init__(
             master,
             fg_color=Theme.BG_DARK,
             text_color=Theme.TEXT_SECONDARY,
-            font=ctk.CTkFont(family="Consolas", size=12),
+            font=get_font(12, family="Consolas"),
             corner_radius=8,
             border_width=1,
             border_color=Theme.BORDER,
@@ -192,22 +256,55 @@ class LogDisplay(ctk.CTkTextbox):
         self.configure(state="disabled")
         
         # タグ設定
-        self._textbox.tag_configure("success", foreground=Theme.SUCCESS)
-        self._textbox.tag_configure("error", foreground=Theme.ERROR)
-        self._textbox.tag_configure("warning", foreground=Theme.WARNING)
-        self._textbox.tag_configure("info", foreground=Theme.TEXT_SECONDARY)
-        self._textbox.tag_configure("auto", foreground=Theme.INFO)
-        self._textbox.tag_configure("timestamp", foreground=Theme.TEXT_MUTED)
+        for tag, color in self._TAG_COLORS.items():
+            self._textbox.tag_configure(tag, foreground=color)
+        
+        # 書き込み待ちのログ (timestamp, message, level)
+        self._queue: deque = deque()
+        self._pending = False
     
-    def log(self, message: str, level: str = "info"):
+    def log(self, message: str, level: str = "info", _time=time.time, _cache=_TS_CACHE):
+        # _time/_cache はローカル参照にするための既定引数（呼び出し側は指定しない）
+        sec = int(_time())
+        if sec != _cache[0]:
+            _cache[0] = sec
+            _cache[1] = time.strftime("%H:%M:%S", time.localtime(sec))
+        timestamp = _cache[1]
+        self._queue.append((timestamp, message, level))
+        if not self._pending:
+            # 同じイベント処理中に届いたログは次のアイドル時に1回で描画
+            self._pending = True
+            self.after_idle(self._flush)
+    
+    def _flush(self):
+        """溜まったログをまとめてテキストボックスへ書き込む"""
+        self._pending = False
+        if not self._queue:
+            return
+        
+        # (テキスト, タグ) を並べて1回の insert で書き込む
+        chunks = []
+        append = chunks.append
+        popleft = self._queue.popleft
+        while self._queue:
+            timestamp, message, level = popleft()
+            append(f"[{timestamp}] ")
+            append("timestamp")
+            append(f"{message}\n")
+            append(level)
+        
         self.configure(state="normal")
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self._textbox.insert("end", f"[{timestamp}] ", "timestamp")
-        self._textbox.insert("end", f"{message}\n", level)
+        self._textbox.insert("end", *chunks)
+        
+        line_count = int(self._textbox.index("end-1c").split(".")[0]) - 1
+        if line_count > self.MAX_LINES:
+            self._textbox.delete("1.0", f"{line_count - self.MAX_LINES + 1}.0")
+        
         self._textbox.see("end")
         self.configure(state="disabled")
     
     def clear(self):
+        self._queue.clear()
         self.configure(state="normal")
         self._textbox.delete("1.0", "end")
         self.configure(state="disabled")
@@ -221,6 +318,7 @@ class SettingsDialog(ctk.CTkToplevel):
     def __init__(self, parent, on_save_callback=None):
         super().__init__(parent)
         
+        self.app = parent
         self.on_save_callback = on_save_callback
         
         self.title("設定")
@@ -245,13 +343,19 @@ class SettingsDialog(ctk.CTkToplevel):
         self.show_apikey = False
         self.show_notion_apikey = False
         
+        # 接続テスト実行中フラグ（連打されたテストは無視する）
+        self._test_in_flight = False
+        
         self.create_widgets()
         self.load_settings()
     
     def create_widgets(self):
-        # ボタン行を先に下部に配置（固定）
+        # ダイアログ全体: 0行目=スクロール領域（伸縮）、1行目=ボタン行（固定）
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        
         btn_frame = ctk.CTkFrame(self, fg_color=Theme.BG_SECONDARY, height=60)
-        btn_frame.pack(side="bottom", fill="x", padx=0, pady=0)
+        btn_frame.grid(row=1, column=0, sticky="ew")
         btn_frame.pack_propagate(False)
         
         btn_inner = ctk.CTkFrame(btn_frame, fg_color="transparent")
@@ -268,85 +372,96 @@ class SettingsDialog(ctk.CTkToplevel):
             scrollbar_button_color=Theme.BORDER,
             scrollbar_button_hover_color=Theme.TEXT_MUTED
         )
-        self.scrollable_frame.pack(fill="both", expand=True, padx=20, pady=(16, 10))
         
         main = self.scrollable_frame
+        main.grid_columnconfigure(0, weight=1)
+        
+        # フォームは1列のgridに上から順に配置
+        row = 0
+        
+        def add_row(widget, sticky="w", pady=0):
+            nonlocal row
+            widget.grid(row=row, column=0, sticky=sticky, pady=pady)
+            row += 1
         
         # タイトル
-        ctk.CTkLabel(
+        add_row(ctk.CTkLabel(
             main,
             text="⚙️ 設定",
-            font=ctk.CTkFont(size=20, weight="bold"),
+            font=get_font(20, "bold"),
             text_color=Theme.TEXT_PRIMARY
-        ).pack(anchor="w", pady=(0, 16))
+        ), pady=(0, 16))
         
         # === TopstepX設定 ===
         topstepx_header = ctk.CTkFrame(main, fg_color=Theme.BG_CARD, corner_radius=8)
-        topstepx_header.pack(fill="x", pady=(0, 4))
+        add_row(topstepx_header, sticky="ew", pady=(0, 4))
         ctk.CTkLabel(
             topstepx_header,
             text="  TopstepX API",
-            font=ctk.CTkFont(size=14, weight="bold"),
+            font=get_font(14, "bold"),
             text_color=Theme.TEXT_PRIMARY
         ).pack(anchor="w", pady=8)
         
         # Username
-        ctk.CTkLabel(main, text="Username", font=ctk.CTkFont(size=12), text_color=Theme.TEXT_SECONDARY).pack(anchor="w", pady=(8, 0))
+        add_row(ctk.CTkLabel(main, text="Username", font=get_font(12), text_color=Theme.TEXT_SECONDARY), pady=(8, 0))
         self.username_entry = ctk.CTkEntry(main, height=38, fg_color=Theme.BG_INPUT, border_color=Theme.BORDER, corner_radius=6, placeholder_text="TopstepXのユーザー名")
-        self.username_entry.pack(fill="x", pady=(4, 8))
+        add_row(self.username_entry, sticky="ew", pady=(4, 8))
         
         # API Key行
         apikey_row = ctk.CTkFrame(main, fg_color="transparent")
-        apikey_row.pack(fill="x")
-        ctk.CTkLabel(apikey_row, text="API Key", font=ctk.CTkFont(size=12), text_color=Theme.TEXT_SECONDARY).pack(side="left")
-        self.show_apikey_btn = ctk.CTkButton(apikey_row, text="表示", font=ctk.CTkFont(size=10), width=50, height=22,
+        add_row(apikey_row, sticky="ew")
+        ctk.CTkLabel(apikey_row, text="API Key", font=get_font(12), text_color=Theme.TEXT_SECONDARY).pack(side="left")
+        self.show_apikey_btn = ctk.CTkButton(apikey_row, text="表示", font=get_font(10), width=50, height=22,
             fg_color="transparent", hover_color=Theme.BG_CARD, text_color=Theme.TEXT_MUTED, command=self.toggle_apikey_visibility)
         self.show_apikey_btn.pack(side="right")
         
         self.apikey_entry = ctk.CTkEntry(main, height=38, fg_color=Theme.BG_INPUT, border_color=Theme.BORDER, corner_radius=6, show="•", placeholder_text="APIキー")
-        self.apikey_entry.pack(fill="x", pady=(4, 8))
+        add_row(self.apikey_entry, sticky="ew", pady=(4, 8))
         
         # TopstepX接続テスト
-        ModernButton(main, text="🔗 接続テスト", variant="secondary", width=130, height=32, command=self.test_topstepx).pack(anchor="w", pady=(4, 16))
+        add_row(ModernButton(main, text="🔗 接続テスト", variant="secondary", width=130, height=32, command=self.test_topstepx), pady=(4, 16))
         
         # 区切り線
-        ctk.CTkFrame(main, height=1, fg_color=Theme.BORDER).pack(fill="x", pady=(0, 16))
+        add_row(ctk.CTkFrame(main, height=1, fg_color=Theme.BORDER), sticky="ew", pady=(0, 16))
         
         # === Notion設定 ===
         notion_header = ctk.CTkFrame(main, fg_color=Theme.BG_CARD, corner_radius=8)
-        notion_header.pack(fill="x", pady=(0, 4))
+        add_row(notion_header, sticky="ew", pady=(0, 4))
         ctk.CTkLabel(
             notion_header,
             text="  Notion API",
-            font=ctk.CTkFont(size=14, weight="bold"),
+            font=get_font(14, "bold"),
             text_color=Theme.TEXT_PRIMARY
         ).pack(anchor="w", pady=8)
         
         # Integration Token行
         token_row = ctk.CTkFrame(main, fg_color="transparent")
-        token_row.pack(fill="x", pady=(8, 0))
-        ctk.CTkLabel(token_row, text="Integration Token", font=ctk.CTkFont(size=12), text_color=Theme.TEXT_SECONDARY).pack(side="left")
-        self.show_notion_apikey_btn = ctk.CTkButton(token_row, text="表示", font=ctk.CTkFont(size=10), width=50, height=22,
+        add_row(token_row, sticky="ew", pady=(8, 0))
+        ctk.CTkLabel(token_row, text="Integration Token", font=get_font(12), text_color=Theme.TEXT_SECONDARY).pack(side="left")
+        self.show_notion_apikey_btn = ctk.CTkButton(token_row, text="表示", font=get_font(10), width=50, height=22,
             fg_color="transparent", hover_color=Theme.BG_CARD, text_color=Theme.TEXT_MUTED, command=self.toggle_notion_apikey_visibility)
         self.show_notion_apikey_btn.pack(side="right")
         
         self.notion_apikey_entry = ctk.CTkEntry(main, height=38, fg_color=Theme.BG_INPUT, border_color=Theme.BORDER, corner_radius=6, show="•", placeholder_text="ntn_xxxx...")
-        self.notion_apikey_entry.pack(fill="x", pady=(4, 8))
+        add_row(self.notion_apikey_entry, sticky="ew", pady=(4, 8))
         
         # Database ID
-        ctk.CTkLabel(main, text="Database ID", font=ctk.CTkFont(size=12), text_color=Theme.TEXT_SECONDARY).pack(anchor="w")
+        add_row(ctk.CTkLabel(main, text="Database ID", font=get_font(12), text_color=Theme.TEXT_SECONDARY))
         self.dbid_entry = ctk.CTkEntry(main, height=38, fg_color=Theme.BG_INPUT, border_color=Theme.BORDER, corner_radius=6, placeholder_text="データベースID")
-        self.dbid_entry.pack(fill="x", pady=(4, 2))
-        ctk.CTkLabel(main, text="💡 URLの https://notion.so/xxxxx?v=... の xxxxx 部分", font=ctk.CTkFont(size=10), text_color=Theme.TEXT_MUTED).pack(anchor="w", pady=(0, 8))
+        add_row(self.dbid_entry, sticky="ew", pady=(4, 2))
+        add_row(ctk.CTkLabel(main, text="💡 URLの https://notion.so/xxxxx?v=... の xxxxx 部分", font=get_font(10), text_color=Theme.TEXT_MUTED), pady=(0, 8))
         
         # Notion接続テスト
-        ModernButton(main, text="🔗 接続テスト", variant="secondary", width=130, height=32, command=self.test_notion).pack(anchor="w", pady=(4, 16))
+        add_row(ModernButton(main, text="🔗 接続テスト", variant="secondary", width=130, height=32, command=self.test_notion), pady=(4, 16))
         
         # ステータス表示エリア
         status_frame = ctk.CTkFrame(main, fg_color=Theme.BG_SECONDARY, corner_radius=8)
-        status_frame.pack(fill="x", pady=(8, 0))
-        self.status_label = ctk.CTkLabel(status_frame, text="設定を入力してください", font=ctk.CTkFont(size=12), text_color=Theme.TEXT_MUTED)
+        add_row(status_frame, sticky="ew", pady=(8, 0))
+        self.status_label = ctk.CTkLabel(status_frame, text="設定を入力してください", font=get_font(12), text_color=Theme.TEXT_MUTED)
         self.status_label.pack(pady=12)
+        
+        # 子ウィジェットをすべて配置してからスクロール領域を表示
+        self.scrollable_frame.grid(row=0, column=0, sticky="nsew", padx=20, pady=(16, 10))
     
     def toggle_apikey_visibility(self):
         """TopstepX APIキーの表示/非表示を切り替え"""
@@ -377,29 +492,38 @@ class SettingsDialog(ctk.CTkToplevel):
             self.status_label.configure(text="✗ UsernameとAPI Keyを入力してください", text_color=Theme.ERROR)
             return
         
+        if self._test_in_flight:
+            return
+        self._test_in_flight = True
+        
         self.status_label.configure(text="🔄 TopstepX接続テスト中...", text_color=Theme.INFO)
         self.update()
         
+        from topstepx_client import TopstepXClient
+        session = _shared_http_session()
+        
         def test():
             try:
-                import requests
-                topstepx = TopstepXClient.__new__(TopstepXClient)
-                topstepx.username = username
-                topstepx.api_key = api_key
-                topstepx.session_token = None
-                topstepx.session = requests.Session()
-                topstepx.BASE_URL = "https://api.topstepx.com/api"
+                # 試しのログインなのでトークンは保存しない
+                topstepx = TopstepXClient.from_api_key(
+                    username, api_key, session=session, use_token_cache=False
+                )
+                topstepx.timeout = CONNECTION_TEST_TIMEOUT
                 topstepx.authenticate()
                 
-                self.after(0, lambda: self.status_label.configure(
-                    text="✓ TopstepX接続成功!", text_color=Theme.SUCCESS
+                self.app._post_ui("call", lambda: self._show_test_result(
+                    "✓ TopstepX接続成功!", Theme.SUCCESS
                 ))
             except Exception as e:
-                self.after(0, lambda: self.status_label.configure(
-                    text=f"✗ TopstepX接続失敗: {str(e)[:40]}", text_color=Theme.ERROR
+                self.app._post_ui("call", lambda err=str(e): self._show_test_result(
+                    f"✗ TopstepX接続失敗: {err[:40]}", Theme.ERROR
                 ))
+            finally:
+                self.app._post_ui("call", self._finish_test)
+                self.app._post_ui("done")
         
-        threading.Thread(target=test, daemon=True).start()
+        self.app._begin_ui_task()
+        self.app.test_executor.submit(test)
     
     def test_notion(self):
         """Notion接続テスト"""
@@ -410,24 +534,40 @@ class SettingsDialog(ctk.CTkToplevel):
             self.status_label.configure(text="✗ API KeyとDatabase IDを入力してください", text_color=Theme.ERROR)
             return
         
+        if self._test_in_flight:
+            return
+        self._test_in_flight = True
+        
         self.status_label.configure(text="🔄 Notion接続テスト中...", text_color=Theme.INFO)
         self.update()
         
         def test():
             try:
-                notion = NotionRoundtripClient(api_key=api_key, database_id=database_id)
+                notion = self.app.get_notion_test_client(api_key, database_id)
                 db_info = notion.get_database()
                 db_title = db_info.get('title', [{}])[0].get('plain_text', 'Database')
                 
-                self.after(0, lambda: self.status_label.configure(
-                    text=f"✓ Notion接続成功: {db_title}", text_color=Theme.SUCCESS
+                self.app._post_ui("call", lambda: self._show_test_result(
+                    f"✓ Notion接続成功: {db_title}", Theme.SUCCESS
                 ))
             except Exception as e:
-                self.after(0, lambda: self.status_label.configure(
-                    text=f"✗ Notion接続失敗: {str(e)[:40]}", text_color=Theme.ERROR
+                self.app._post_ui("call", lambda err=str(e): self._show_test_result(
+                    f"✗ Notion接続失敗: {err[:40]}", Theme.ERROR
                 ))
+            finally:
+                self.app._post_ui("call", self._finish_test)
+                self.app._post_ui("done")
         
-        threading.Thread(target=test, daemon=True).start()
+        self.app._begin_ui_task()
+        self.app.test_executor.submit(test)
+    
+    def _show_test_result(self, text: str, color: str):
+        """接続テストの結果を表示（テスト中にダイアログが閉じられていれば何もしない）"""
+        if self.winfo_exists():
+            self.status_label.configure(text=text, text_color=color)
+    
+    def _finish_test(self):
+        self._test_in_flight = False
     
     def save_only(self):
         """保存のみ（接続はしない）"""
@@ -436,10 +576,8 @@ class SettingsDialog(ctk.CTkToplevel):
     
     def load_settings(self):
         try:
-            if Path(self.CREDENTIALS_PATH).exists():
-                with open(self.CREDENTIALS_PATH, 'r', encoding='utf-8') as f:
-                    creds = json.load(f)
-                
+            creds = self.app.get_credentials()
+            if creds is not None:
                 # 入力欄をクリア
                 self.username_entry.delete(0, "end")
                 self.apikey_entry.delete(0, "end")
@@ -487,8 +625,11 @@ class SettingsDialog(ctk.CTkToplevel):
         }
         
         try:
-            with open(self.CREDENTIALS_PATH, 'w', encoding='utf-8') as f:
-                json.dump(creds, f, indent=4, ensure_ascii=False)
+            # 一時ファイルに書き出してから置き換え（書き込み途中の破損を防ぐ）
+            tmp_path = f"{self.CREDENTIALS_PATH}.tmp"
+            Path(tmp_path).write_bytes(json_dumps(creds))
+            os.replace(tmp_path, self.CREDENTIALS_PATH)
+            self.app.update_credentials(creds)
             return True
         except Exception as e:
             self.status_label.configure(text=f"✗ 保存エラー: {e}", text_color=Theme.ERROR)
@@ -504,11 +645,13 @@ class SettingsDialog(ctk.CTkToplevel):
 class AutoSyncManager:
     """自動同期マネージャー"""
     
-    def __init__(self, callback):
+    def __init__(self, callback, on_start=None):
         self.callback = callback
+        self.on_start = on_start
         self.is_running = False
         self.interval_minutes = 30
         self.next_sync_time: Optional[datetime] = None
+        self._next_sync_monotonic: Optional[float] = None
         self.thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
     
@@ -522,35 +665,39 @@ class AutoSyncManager:
         
         self.thread = threading.Thread(target=self._run_loop, daemon=True)
         self.thread.start()
+        
+        if self.on_start:
+            self.on_start()
     
     def stop(self):
         self.is_running = False
         self.stop_event.set()
         self.next_sync_time = None
+        self._next_sync_monotonic = None
     
     def _run_loop(self):
         while self.is_running and not self.stop_event.is_set():
             self.next_sync_time = datetime.now() + timedelta(minutes=self.interval_minutes)
+            self._next_sync_monotonic = time.monotonic() + self.interval_minutes * 60
             
+            # 停止要求があれば即座に抜ける（待機中はスレッドを起こさない）
             wait_seconds = self.interval_minutes * 60
-            for _ in range(wait_seconds):
-                if self.stop_event.is_set():
-                    return
-                time.sleep(1)
+            if self.stop_event.wait(timeout=wait_seconds):
+                return
             
             if self.is_running and not self.stop_event.is_set():
                 self.callback()
     
     def get_remaining_time(self) -> str:
-        if not self.next_sync_time:
+        next_sync = self._next_sync_monotonic
+        if next_sync is None:
             return "--:--"
         
-        remaining = self.next_sync_time - datetime.now()
-        if remaining.total_seconds() <= 0:
+        remaining = next_sync - time.monotonic()
+        if remaining <= 0:
             return "同期中..."
         
-        minutes = int(remaining.total_seconds() // 60)
-        seconds = int(remaining.total_seconds() % 60)
+        minutes, seconds = divmod(int(remaining), 60)
         return f"{minutes:02d}:{seconds:02d}"
 
 
@@ -558,6 +705,26 @@ class SyncApp(ctk.CTk):
     """TopstepX → Notion 同期 GUIアプリ"""
     
     SYNC_SETTINGS_PATH = "sync_settings.json"
+    CREDENTIALS_PATH = "credentials.json"
+    
+    # 全アカウント同期の並列数 / Notionへの同時書き込み数（3 req/s 制限対策）
+    SYNC_WORKERS = 8
+    NOTION_CONCURRENCY = 3
+    
+    # ワーカースレッドからのUI更新をまとめて反映する間隔
+    UI_FLUSH_INTERVAL_MS = 100
+    
+    # 期間 / 自動同期間隔の選択肢 (表示名, 値)
+    _PERIODS = (("1日", "1"), ("7日間", "7"), ("30日間", "30"), ("90日間", "90"))
+    _INTERVALS = (("5分", "5"), ("15分", "15"), ("30分", "30"), ("1時間", "60"))
+    
+    # アカウント名に含まれる文字列 → 分類（先に一致したものを採用、どれにも一致しなければコンバイン）
+    _ACCOUNT_CATEGORIES = (
+        ("EXPRESS", "express"),
+        ("KTC", "combine"),
+        ("PRACTICE", "practice"),
+        ("PRAC-", "practice"),
+    )
     
     def __init__(self):
         super().__init__()
@@ -580,16 +747,44 @@ class SyncApp(ctk.CTk):
         self.topstepx: Optional[TopstepXClient] = None
         self.notion: Optional[NotionRoundtripClient] = None
         self.accounts: List[Dict] = []
+        # プルダウンの表示文字列 → アカウント（_update_account_list で構築）
+        self._account_by_display: Dict[str, Dict] = {}
         self.is_syncing = False
         
+        # 接続テスト用の常駐ワーカー（クリックごとにスレッドを生成しない）
+        self.test_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conn-test")
+        self._notion_test_client: Optional[NotionRoundtripClient] = None
+        
+        # credentials.json のキャッシュ（保存時に更新）
+        self._creds_cache: Optional[Dict] = None
+        # 最後に読み書きした sync_settings.json の内容（変更がなければ保存しない）
+        self._saved_sync_settings: Optional[Dict] = None
+        
+        # ワーカースレッド → UI への更新キュー（Tkスレッドでまとめて反映）
+        self._ui_queue: queue.Queue = queue.Queue()
+        self._ui_flush_job: Optional[str] = None
+        # キューを使うワーカー処理の実行数（0になれば反映ループを止める）
+        self._ui_busy = 0
+        
+        # 同期用ワーカー（取得・変換 → Notion書き込みの2段）
+        self._sync_pool = ThreadPoolExecutor(max_workers=self.SYNC_WORKERS, thread_name_prefix="sync")
+        self._notion_pool = ThreadPoolExecutor(max_workers=self.NOTION_CONCURRENCY, thread_name_prefix="notion")
+        # 変換器はワーカースレッドごとに1つを使い回す
+        self._worker_local = threading.local()
+        # ウィンドウを閉じたら新しい処理をワーカーに渡さない
+        self._closing = False
+        
         # 自動同期マネージャー
-        self.auto_sync = AutoSyncManager(callback=self._auto_sync_callback)
+        self.auto_sync = AutoSyncManager(
+            callback=self._auto_sync_callback,
+            on_start=lambda: self.after(0, self._restart_timer)
+        )
         
         # UI構築
         self.create_widgets()
         
-        # タイマー更新
-        self.update_timer()
+        # タイマー更新（自動同期の開始時に動き出す）
+        self._timer_job: Optional[str] = None
         
         # 認証情報の自動読み込み
         self.after(100, self.auto_load_credentials)
@@ -617,14 +812,14 @@ class SyncApp(ctk.CTk):
         ctk.CTkLabel(
             title_frame,
             text="🔄 TopstepX → Notion",
-            font=ctk.CTkFont(size=28, weight="bold"),
+            font=get_font(28, "bold"),
             text_color=Theme.TEXT_PRIMARY
         ).pack(anchor="w")
         
         ctk.CTkLabel(
             title_frame,
             text="トレードデータ同期ツール",
-            font=ctk.CTkFont(size=14),
+            font=get_font(14),
             text_color=Theme.TEXT_MUTED
         ).pack(anchor="w", pady=(4, 0))
         
@@ -650,7 +845,7 @@ class SyncApp(ctk.CTk):
         ctk.CTkLabel(
             ts_frame,
             text="TopstepX",
-            font=ctk.CTkFont(size=12),
+            font=get_font(12),
             text_color=Theme.TEXT_MUTED
         ).pack(anchor="w")
         
@@ -664,7 +859,7 @@ class SyncApp(ctk.CTk):
         ctk.CTkLabel(
             notion_frame,
             text="Notion",
-            font=ctk.CTkFont(size=12),
+            font=get_font(12),
             text_color=Theme.TEXT_MUTED
         ).pack(anchor="w")
         
@@ -700,7 +895,7 @@ class SyncApp(ctk.CTk):
         ctk.CTkLabel(
             sync_card.content,
             text="アカウント",
-            font=ctk.CTkFont(size=12),
+            font=get_font(12),
             text_color=Theme.TEXT_MUTED
         ).pack(anchor="w")
         
@@ -724,7 +919,7 @@ class SyncApp(ctk.CTk):
         ctk.CTkLabel(
             sync_card.content,
             text="期間",
-            font=ctk.CTkFont(size=12),
+            font=get_font(12),
             text_color=Theme.TEXT_MUTED
         ).pack(anchor="w")
         
@@ -732,9 +927,8 @@ class SyncApp(ctk.CTk):
         period_frame.pack(fill="x", pady=(4, 0))
         
         self.period_var = ctk.StringVar(value="7")
-        periods = [("1日", "1"), ("7日間", "7"), ("30日間", "30"), ("90日間", "90")]
         
-        for text, value in periods:
+        for text, value in self._PERIODS:
             ctk.CTkRadioButton(
                 period_frame,
                 text=text,
@@ -788,7 +982,7 @@ class SyncApp(ctk.CTk):
         ctk.CTkLabel(
             auto_card.content,
             text="同期間隔",
-            font=ctk.CTkFont(size=12),
+            font=get_font(12),
             text_color=Theme.TEXT_MUTED
         ).pack(anchor="w")
         
@@ -796,9 +990,8 @@ class SyncApp(ctk.CTk):
         interval_frame.pack(fill="x", pady=(4, 16))
         
         self.interval_var = ctk.StringVar(value="30")
-        intervals = [("5分", "5"), ("15分", "15"), ("30分", "30"), ("1時間", "60")]
         
-        for text, value in intervals:
+        for text, value in self._INTERVALS:
             ctk.CTkRadioButton(
                 interval_frame,
                 text=text,
@@ -814,7 +1007,7 @@ class SyncApp(ctk.CTk):
         ctk.CTkLabel(
             auto_card.content,
             text="同期対象",
-            font=ctk.CTkFont(size=12),
+            font=get_font(12),
             text_color=Theme.TEXT_MUTED
         ).pack(anchor="w")
         
@@ -875,7 +1068,7 @@ class SyncApp(ctk.CTk):
         self.auto_status = ctk.CTkLabel(
             timer_frame,
             text="停止中",
-            font=ctk.CTkFont(size=12),
+            font=get_font(12),
             text_color=Theme.TEXT_MUTED
         )
         self.auto_status.pack(side="left", padx=(0, 12))
@@ -883,14 +1076,14 @@ class SyncApp(ctk.CTk):
         ctk.CTkLabel(
             timer_frame,
             text="次回:",
-            font=ctk.CTkFont(size=12),
+            font=get_font(12),
             text_color=Theme.TEXT_MUTED
         ).pack(side="left")
         
         self.timer_label = ctk.CTkLabel(
             timer_frame,
             text="--:--",
-            font=ctk.CTkFont(size=24, weight="bold"),
+            font=get_font(24, "bold"),
             text_color=Theme.TEXT_MUTED
         )
         self.timer_label.pack(side="left", padx=(8, 0))
@@ -917,7 +1110,7 @@ class SyncApp(ctk.CTk):
             self.stats_labels[key] = ctk.CTkLabel(
                 frame,
                 text="-",
-                font=ctk.CTkFont(size=28, weight="bold"),
+                font=get_font(28, "bold"),
                 text_color=color
             )
             self.stats_labels[key].pack()
@@ -925,7 +1118,7 @@ class SyncApp(ctk.CTk):
             ctk.CTkLabel(
                 frame,
                 text=label,
-                font=ctk.CTkFont(size=11),
+                font=get_font(11),
                 text_color=Theme.TEXT_MUTED
             ).pack()
         
@@ -936,14 +1129,14 @@ class SyncApp(ctk.CTk):
         ctk.CTkLabel(
             last_sync_frame,
             text="最終同期:",
-            font=ctk.CTkFont(size=12),
+            font=get_font(12),
             text_color=Theme.TEXT_MUTED
         ).pack(side="left")
         
         self.last_sync_label = ctk.CTkLabel(
             last_sync_frame,
             text="-",
-            font=ctk.CTkFont(size=12),
+            font=get_font(12),
             text_color=Theme.TEXT_SECONDARY
         )
         self.last_sync_label.pack(side="left", padx=(8, 0))
@@ -956,8 +1149,8 @@ class SyncApp(ctk.CTk):
         self.log_display.pack(fill="both", expand=True)
     
     def log(self, message: str, level: str = "info"):
+        # 描画は LogDisplay のバッチ反映と Tk のアイドル処理に任せる
         self.log_display.log(message, level)
-        self.update_idletasks()
     
     def update_stats(self, stats: Dict[str, int]):
         for key, label in self.stats_labels.items():
@@ -969,13 +1162,27 @@ class SyncApp(ctk.CTk):
             label.configure(text="-")
     
     def update_timer(self):
+        # 自動同期中のみ1秒ごとに更新（停止中は再スケジュールしない）
+        self._timer_job = None
         if self.auto_sync.is_running:
             remaining = self.auto_sync.get_remaining_time()
             self.timer_label.configure(text=remaining, text_color=Theme.SUCCESS)
+            # 自動同期スレッドからの依頼（_auto_sync_callback）を反映
+            if not self._ui_queue.empty():
+                self._schedule_ui_flush()
+            self._timer_job = self.after(1000, self.update_timer)
         else:
             self.timer_label.configure(text="--:--", text_color=Theme.TEXT_MUTED)
-        
-        self.after(1000, self.update_timer)
+    
+    def _cancel_timer(self):
+        if self._timer_job is not None:
+            self.after_cancel(self._timer_job)
+            self._timer_job = None
+    
+    def _restart_timer(self):
+        # 停止→開始を素早く繰り返しても更新ループが二重にならないようにする
+        self._cancel_timer()
+        self.update_timer()
     
     def auto_load_credentials(self):
         if Path("credentials.json").exists():
@@ -988,9 +1195,38 @@ class SyncApp(ctk.CTk):
     def open_settings(self):
         SettingsDialog(self, on_save_callback=self.connect)
     
+    def get_credentials(self) -> Optional[Dict]:
+        """credentials.json の内容を取得（初回のみファイルを読み込む）"""
+        if self._creds_cache is None:
+            creds_path = Path(self.CREDENTIALS_PATH)
+            if not creds_path.exists():
+                return None
+            self._creds_cache = json_loads(creds_path.read_bytes())
+        return self._creds_cache
+    
+    def update_credentials(self, creds: Dict):
+        """保存済みの認証情報でキャッシュを更新"""
+        if self._creds_cache is None:
+            self._creds_cache = creds
+        else:
+            self._creds_cache.clear()
+            self._creds_cache.update(creds)
+    
+    def get_notion_test_client(self, api_key: str, database_id: str) -> "NotionRoundtripClient":
+        """接続テスト用のNotionクライアントを取得（同じ認証情報ならセッションを再利用）"""
+        from notion_client import NotionRoundtripClient
+        
+        client = self._notion_test_client
+        if client is None or client.api_key != api_key or client.database_id != database_id:
+            client = NotionRoundtripClient(api_key=api_key, database_id=database_id)
+            _apply_default_timeout(client.session)
+            self._notion_test_client = client
+        return client
+    
     def connect(self):
         self.connect_btn.configure(state="disabled")
         self.log("接続中...")
+        self._begin_ui_task()
         
         thread = threading.Thread(target=self._connect_async)
         thread.daemon = True
@@ -998,27 +1234,36 @@ class SyncApp(ctk.CTk):
     
     def _connect_async(self):
         try:
-            creds = load_credentials("credentials.json")
+            from topstepx_client import TopstepXClient
+            from notion_client import NotionRoundtripClient, normalize_credentials
+            
+            # 読み込み済みの内容を再利用（設定保存時は update_credentials で更新済み）
+            raw_creds = self.get_credentials()
+            if raw_creds is None:
+                raise FileNotFoundError(self.CREDENTIALS_PATH)
+            creds = normalize_credentials(raw_creds)
             topstepx_creds = creds.get("topstepx", {})
             notion_creds = creds.get("notion", {})
             
-            self.after(0, lambda: self.log("TopstepX認証中..."))
+            self._post_ui("log", "TopstepX認証中...")
             
-            topstepx = TopstepXClient.__new__(TopstepXClient)
-            topstepx.username = topstepx_creds["username"]
-            topstepx.api_key = topstepx_creds["api_key"]
-            topstepx.session_token = None
-            topstepx.session = __import__('requests').Session()
-            topstepx.BASE_URL = "https://api.topstepx.com/api"
-            topstepx.authenticate()
+            topstepx = TopstepXClient.from_api_key(
+                topstepx_creds["username"],
+                topstepx_creds["api_key"]
+            )
+            # 保存済みのトークンが期限内なら認証APIは呼ばない
+            topstepx.ensure_authenticated()
             
-            self.topstepx = topstepx
-            self.after(0, lambda: self.topstepx_status.set_status(
-                f"接続済み ({topstepx_creds['username']})", "success"
+            # 再接続の場合は古いクライアントのセッションを閉じる（このワーカースレッドで行う）
+            old_topstepx, self.topstepx = self.topstepx, topstepx
+            if old_topstepx is not None and old_topstepx is not topstepx:
+                old_topstepx.close()
+            self._post_ui("call", lambda u=topstepx_creds['username']: self.topstepx_status.set_status(
+                f"接続済み ({u})", "success"
             ))
-            self.after(0, lambda: self.log("TopstepX接続成功", "success"))
+            self._post_ui("log", "TopstepX接続成功", "success")
             
-            self.after(0, lambda: self.log("Notion接続中..."))
+            self._post_ui("log", "Notion接続中...")
             
             notion = NotionRoundtripClient(
                 api_key=notion_creds["api_key"],
@@ -1027,26 +1272,32 @@ class SyncApp(ctk.CTk):
             db_info = notion.get_database()
             db_title = db_info.get('title', [{}])[0].get('plain_text', 'Database')
             
-            self.notion = notion
-            self.after(0, lambda: self.notion_status.set_status(
+            # 再接続の場合は古いクライアントの書き込みワーカーを止める
+            old_notion, self.notion = self.notion, notion
+            if old_notion is not None and old_notion is not notion:
+                old_notion.close()
+            self._post_ui("call", lambda: self.notion_status.set_status(
                 f"接続済み ({db_title})", "success"
             ))
-            self.after(0, lambda: self.log(f"Notion接続成功: {db_title}", "success"))
+            self._post_ui("log", f"Notion接続成功: {db_title}", "success")
             
-            self.after(0, lambda: self.log("アカウント一覧を取得中..."))
+            self._post_ui("log", "アカウント一覧を取得中...")
             self.accounts = topstepx.get_accounts()
-            self.after(0, self._update_account_list)
+            self._post_ui("call", self._update_account_list)
             
-            self.after(500, self.restore_auto_sync_settings)
+            self._post_ui("call", lambda: self.after(500, self.restore_auto_sync_settings))
             
         except FileNotFoundError:
-            self.after(0, lambda: self.log("credentials.json が見つかりません", "error"))
+            self._post_ui("log", "credentials.json が見つかりません", "error")
         except Exception as e:
-            self.after(0, lambda: self.log(f"接続エラー: {e}", "error"))
+            self._post_ui("log", f"接続エラー: {e}", "error")
         finally:
-            self.after(0, lambda: self.connect_btn.configure(state="normal"))
+            self._post_ui("call", lambda: self.connect_btn.configure(state="normal"))
+            self._post_ui("done")
     
     def _update_account_list(self):
+        self._account_by_display = {}
+        
         if not self.accounts:
             self.log("アカウントが見つかりません", "warning")
             return
@@ -1054,45 +1305,45 @@ class SyncApp(ctk.CTk):
         express = []
         combine = []
         practice = []
+        groups = {"express": express, "combine": combine, "practice": practice}
+        categories = self._ACCOUNT_CATEGORIES
+        register = self._account_by_display.setdefault
         
         for acc in self.accounts:
-            name = acc.get('name', '').upper()
-            display = f"{acc.get('name')} - ${acc.get('balance', 0):,.2f}"
-            item = (acc.get('id'), display)
+            get = acc.get
+            raw_name = get('name')
+            name = (raw_name or '').upper()
+            display = f"{raw_name} - ${format(get('balance', 0), ',.2f')}"
+            item = (get('id'), display)
+            # 表示が重複する場合は先頭のアカウントを優先（従来の線形探索と同じ）
+            register(display, acc)
             
-            if 'EXPRESS' in name:
-                express.append(item)
-            elif 'KTC' in name:
-                combine.append(item)
-            elif 'PRACTICE' in name or 'PRAC-' in name:
-                practice.append(item)
-            else:
-                combine.append(item)
+            category = next((key for tag, key in categories if tag in name), "combine")
+            groups[category].append(item)
         
-        express.sort(key=lambda x: x[0], reverse=True)
-        combine.sort(key=lambda x: x[0], reverse=True)
-        practice.sort(key=lambda x: x[0], reverse=True)
+        # 表示するのは上位のみなので全件ソートせずに取り出す
+        by_id = lambda x: x[0]
         
         all_items = []
         first_account = None
         
         if express:
             all_items.append("━━ エクスプレス ━━")
-            for item in express[:10]:
+            for item in heapq.nlargest(10, express, key=by_id):
                 all_items.append(item[1])
                 if first_account is None:
                     first_account = item[1]
         
         if combine:
             all_items.append("━━ コンバイン ━━")
-            for item in combine[:5]:
+            for item in heapq.nlargest(5, combine, key=by_id):
                 all_items.append(item[1])
                 if first_account is None:
                     first_account = item[1]
         
         if practice:
             all_items.append("━━ プラクティス ━━")
-            for item in practice[:5]:
+            for item in heapq.nlargest(5, practice, key=by_id):
                 all_items.append(item[1])
                 if first_account is None:
                     first_account = item[1]
@@ -1111,12 +1362,21 @@ class SyncApp(ctk.CTk):
         
         self.log("アカウント再読み込み中...")
         
+        # アカウント一覧を取り直す（キャッシュは使わない）
+        self.topstepx.invalidate("accounts")
+        self._begin_ui_task()
+        
         def reload():
             try:
                 self.accounts = self.topstepx.get_accounts()
-                self.after(0, self._update_account_list)
+                self._post_ui("call", self._update_account_list)
+                # Notionのデータベース情報も取り直す（Hash プロパティの追加などを同期に反映）
+                if self.notion:
+                    self.notion.get_database()
             except Exception as e:
-                self.after(0, lambda: self.log(f"エラー: {e}", "error"))
+                self._post_ui("log", f"エラー: {e}", "error")
+            finally:
+                self._post_ui("done")
         
         thread = threading.Thread(target=reload, daemon=True)
         thread.start()
@@ -1126,11 +1386,7 @@ class SyncApp(ctk.CTk):
         if not selected or selected.startswith("━━"):
             return None
         
-        for acc in self.accounts:
-            display = f"{acc.get('name')} - ${acc.get('balance', 0):,.2f}"
-            if display == selected:
-                return acc
-        return None
+        return self._account_by_display.get(selected)
     
     def get_days(self) -> int:
         return int(self.period_var.get())
@@ -1213,11 +1469,13 @@ class SyncApp(ctk.CTk):
         self.auto_stop_btn.configure(state="normal")
         self.auto_status.configure(text="🟢 実行中", text_color=Theme.SUCCESS)
         
-        self._auto_sync_callback()
+        self._run_auto_sync()
         self.auto_sync.start(interval)
     
     def stop_auto_sync(self):
         self.auto_sync.stop()
+        self._cancel_timer()
+        self.timer_label.configure(text="--:--", text_color=Theme.TEXT_MUTED)
         
         self.log("⏰ 自動同期モード停止", "auto")
         
@@ -1226,8 +1484,13 @@ class SyncApp(ctk.CTk):
         self.auto_status.configure(text="停止中", text_color=Theme.TEXT_MUTED)
     
     def _auto_sync_callback(self):
+        """自動同期の定期実行（AutoSyncManager のスレッドから呼ばれるので、処理はTkスレッドに渡す）"""
+        self._post_ui("call", self._run_auto_sync)
+    
+    def _run_auto_sync(self):
+        """自動同期を1回開始（Tkスレッドで実行）"""
         if self.is_syncing:
-            self.after(0, lambda: self.log("⏰ 前回の同期中のためスキップ", "warning"))
+            self.log("⏰ 前回の同期中のためスキップ", "warning")
             return
         
         days = self.get_days()
@@ -1240,11 +1503,12 @@ class SyncApp(ctk.CTk):
             accounts = [account] if account else []
         
         if not accounts:
-            self.after(0, lambda: self.log("⏰ 同期対象なし", "warning"))
+            self.log("⏰ 同期対象なし", "warning")
             return
         
-        self.after(0, lambda n=len(accounts): self.log(f"⏰ 自動同期実行 ({n} アカウント)", "auto"))
-        self.after(0, self._start_sync_ui)
+        self.log(f"⏰ 自動同期実行 ({len(accounts)} アカウント)", "auto")
+        # 処理中カウンタはワーカー開始前に上げる（完了の "done" より先になるように）
+        self._start_sync_ui()
         
         thread = threading.Thread(
             target=self._sync_async,
@@ -1259,82 +1523,191 @@ class SyncApp(ctk.CTk):
         self.sync_all_btn.configure(state="disabled")
         self.progress.start()
         self.reset_stats()
+        self._begin_ui_task()
+    
+    def _post_ui(self, op: str, *args):
+        """
+        ワーカースレッドからUI更新を依頼する（Tkスレッドで _flush_ui がまとめて反映）
+        
+        op: "log" (message, level) / "stats" (stats) / "call" (callable) / "done"
+        """
+        self._ui_queue.put((op, *args))
+    
+    def _begin_ui_task(self):
+        """キューを使うワーカー処理の開始（Tkスレッドから呼ぶ。終了時は "done" を送る）"""
+        self._ui_busy += 1
+        self._schedule_ui_flush()
+    
+    def _schedule_ui_flush(self):
+        if self._ui_flush_job is None:
+            self._ui_flush_job = self.after(self.UI_FLUSH_INTERVAL_MS, self._flush_ui)
+    
+    def _flush_ui(self):
+        """キューに溜まったUI更新を反映（統計は最新の値だけを1回反映）"""
+        self._ui_flush_job = None
+        latest_stats = None
+        
+        while True:
+            try:
+                op, *args = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if op == "log":
+                self.log(*args)
+            elif op == "stats":
+                latest_stats = args[0]
+            elif op == "call":
+                args[0]()
+            elif op == "done":
+                self._ui_busy -= 1
+        
+        if latest_stats is not None:
+            self.update_stats(latest_stats)
+        
+        # 処理中のワーカーがある、または未反映の更新が残っていれば次回も反映
+        if self._ui_busy > 0 or not self._ui_queue.empty():
+            self._schedule_ui_flush()
     
     def _sync_async(self, accounts: List[Dict], days: int, is_auto: bool = False):
         total_stats = {"roundtrips": 0, "created": 0, "skipped": 0, "errors": 0}
         
         try:
-            end_date = datetime.now(timezone.utc)
-            start_date = end_date - timedelta(days=days)
+            # 全アカウントで同じ期間を使う（現在時刻の取得は1回だけ）
+            end_ts = time.time()
+            end_date = datetime.fromtimestamp(end_ts, tz=timezone.utc)
+            start_date = datetime.fromtimestamp(end_ts - days * 86400, tz=timezone.utc)
             
-            for i, account in enumerate(accounts):
-                account_id = account.get('id')
-                account_name = account.get('name')
+            # 取得・変換が終わったアカウントから順にNotion書き込みへ回す
+            pending = set()
+            for account in accounts:
+                if self._closing:
+                    return
+                pending.add(self._sync_pool.submit(
+                    self._fetch_account_roundtrips, account, start_date, end_date
+                ))
+            done = 0
+            
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
                 
-                self.after(0, lambda n=account_name, idx=i: 
-                    self.log(f"[{idx+1}/{len(accounts)}] {n}")
-                )
+                # 終了中はプールが停止済み（未実行の処理は取り消されている）なので打ち切る
+                if self._closing:
+                    return
                 
-                try:
-                    trades = self.topstepx.get_trades(
-                        account_id=account_id,
-                        start_date=start_date,
-                        end_date=end_date
-                    )
-                    
-                    self.after(0, lambda t=len(trades): 
-                        self.log(f"  {t} 件の片道トレード")
-                    )
-                    
-                    if not trades:
-                        continue
-                    
-                    transformer = RoundtripTransformer()
-                    roundtrips = transformer.transform(trades)
+                for future in finished:
+                    account_name, stats, messages, roundtrips = future.result()
                     
-                    self.after(0, lambda r=len(roundtrips): 
-                        self.log(f"  {r} 件の往復トレード")
-                    )
-                    
-                    if not roundtrips:
+                    if roundtrips:
+                        pending.add(self._notion_pool.submit(
+                            self._write_account_roundtrips, account_name, stats, messages, roundtrips
+                        ))
                         continue
                     
-                    total_stats["roundtrips"] += len(roundtrips)
-                    
-                    sync_result = self.notion.sync_roundtrips(
-                        roundtrips=roundtrips,
-                        account_name=account_name,
-                        skip_existing=True
-                    )
+                    # 集計はこのスレッドだけで行うためロック不要
+                    done += 1
+                    for key in total_stats:
+                        total_stats[key] += stats[key]
                     
-                    total_stats["created"] += sync_result["created"]
-                    total_stats["skipped"] += sync_result["skipped"]
-                    total_stats["errors"] += sync_result["errors"]
-                    
-                    self.after(0, lambda c=sync_result["created"], s=sync_result["skipped"]: 
-                        self.log(f"  ✅ 作成: {c} / スキップ: {s}", "success")
-                    )
-                    
-                    self.after(0, lambda s=total_stats.copy(): self.update_stats(s))
-                    
-                except Exception as e:
-                    total_stats["errors"] += 1
-                    self.after(0, lambda err=str(e): 
-                        self.log(f"  ❌ エラー: {err}", "error")
-                    )
+                    self._post_ui("log", f"[{done}/{len(accounts)}] {account_name}", "info")
+                    for message, level in messages:
+                        self._post_ui("log", message, level)
+                    self._post_ui("stats", total_stats.copy())
             
             prefix = "⏰ " if is_auto else ""
-            self.after(0, lambda s=total_stats, p=prefix: 
-                self.log(f"{p}同期完了! 作成: {s['created']} / スキップ: {s['skipped']}", "success")
+            self._post_ui(
+                "log",
+                f"{prefix}同期完了! 作成: {total_stats['created']} / スキップ: {total_stats['skipped']}",
+                "success"
             )
             
-            now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            self.after(0, lambda t=now_str: self.last_sync_label.configure(text=t))
+            now_str = time.strftime('%Y-%m-%d %H:%M:%S')
+            self._post_ui("call", lambda t=now_str: self.last_sync_label.configure(text=t))
             
         except Exception as e:
-            self.after(0, lambda err=str(e): self.log(f"エラー: {err}", "error"))
+            # 終了中にプールが停止したことによるエラーは表示しない
+            if not self._closing:
+                self._post_ui("log", f"エラー: {e}", "error")
         finally:
-            self.after(0, self._sync_complete)
+            # 同期後は残高が変わっている可能性があるので、次回はアカウント一覧を取り直す
+            if self.topstepx:
+                self.topstepx.invalidate("accounts")
+            self._post_ui("call", self._sync_complete)
+            self._post_ui("done")
+    
+    def _fetch_account_roundtrips(self, account: Dict, start_date: datetime, end_date: datetime):
+        """
+        1アカウント分のトレード取得と往復トレードへの変換（_sync_pool で実行）
+        
+        Returns:
+            (アカウント名, 統計, ログ行 [(メッセージ, レベル), ...], 往復トレード) のタプル
+            書き込み対象がない場合やエラー時は往復トレードが空
+        """
+        account_name = account.get('name')
+        stats = {"roundtrips": 0, "created": 0, "skipped": 0, "errors": 0}
+        messages = []
+        
+        try:
+            trades = self.topstepx.get_trades(
+                account_id=account.get('id'),
+                start_date=start_date,
+                end_date=end_date
+            )
+            messages.append((f"  {len(trades)} 件の片道トレード", "info"))
+            
+            if not trades:
+                return account_name, stats, messages, []
+            
+            roundtrips = self._get_transformer().transform(trades)
+            messages.append((f"  {len(roundtrips)} 件の往復トレード", "info"))
+            stats["roundtrips"] = len(roundtrips)
+            
+        except Exception as e:
+            stats["errors"] += 1
+            messages.append((f"  ❌ エラー: {e}", "error"))
+            return account_name, stats, messages, []
+        
+        return account_name, stats, messages, roundtrips
+    
+    def _get_transformer(self) -> "RoundtripTransformer":
+        """現在のワーカースレッド用の変換器を取得（transform 内で前回の状態はリセットされる）"""
+        transformer = getattr(self._worker_local, "transformer", None)
+        if transformer is None:
+            from roundtrip_transformer import RoundtripTransformer
+            transformer = self._worker_local.transformer = RoundtripTransformer()
+        return transformer
+    
+    def _write_account_roundtrips(self, account_name: str, stats: Dict[str, int],
+                                  messages: List[tuple], roundtrips: List[Dict]):
+        """
+        1アカウント分の往復トレードをNotionへ書き込む（_notion_pool で実行）
+        
+        同時書き込み数は _notion_pool のワーカー数（NOTION_CONCURRENCY）で制限
+        
+        Returns:
+            (アカウント名, 統計, ログ行, None) のタプル
+        """
+        try:
+            sync_result = self.notion.sync_roundtrips(
+                roundtrips=roundtrips,
+                account_name=account_name,
+                skip_existing=True
+            )
+            
+            stats["created"] = sync_result["created"]
+            stats["skipped"] = sync_result["skipped"]
+            stats["errors"] = sync_result["errors"]
+            
+            summary = f"  ✅ 作成: {sync_result['created']} / スキップ: {sync_result['skipped']}"
+            if sync_result.get("updated"):
+                summary += f" / 更新: {sync_result['updated']}"
+            messages.append((summary, "success"))
+            
+        except Exception as e:
+            stats["errors"] += 1
+            messages.append((f"  ❌ エラー: {e}", "error"))
+        
+        return account_name, stats, messages, None
     
     def _sync_complete(self):
         self.is_syncing = False
@@ -1352,17 +1725,24 @@ class SyncApp(ctk.CTk):
             "auto_target": self.auto_target_var.get()
         }
         
+        if settings == self._saved_sync_settings:
+            return
+        
         try:
-            with open(self.SYNC_SETTINGS_PATH, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2, ensure_ascii=False)
+            # 一時ファイルに書き出してから置き換え（書き込み途中の破損を防ぐ）
+            tmp_path = f"{self.SYNC_SETTINGS_PATH}.tmp"
+            Path(tmp_path).write_bytes(json_dumps(settings))
+            os.replace(tmp_path, self.SYNC_SETTINGS_PATH)
+            self._saved_sync_settings = settings
         except Exception:
             pass
     
     def load_sync_settings(self) -> Optional[Dict]:
         try:
-            if Path(self.SYNC_SETTINGS_PATH).exists():
-                with open(self.SYNC_SETTINGS_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            settings_path = Path(self.SYNC_SETTINGS_PATH)
+            if settings_path.exists():
+                self._saved_sync_settings = json_loads(settings_path.read_bytes())
+                return self._saved_sync_settings
         except Exception:
             pass
         return None
@@ -1415,7 +1795,7 @@ class SyncApp(ctk.CTk):
         self.auto_stop_btn.configure(state="normal")
         self.auto_status.configure(text="🟢 実行中", text_color=Theme.SUCCESS)
         
-        self._auto_sync_callback()
+        self._run_auto_sync()
         self.auto_sync.start(interval)
     
     def on_closing(self):
@@ -1430,6 +1810,15 @@ class SyncApp(ctk.CTk):
                 return
             self.auto_sync.stop()
         
+        self.test_executor.shutdown(wait=False)
+        # 未実行の取得・書き込みは取り消す（非デーモンのワーカーが残っているとプロセスが終了しない）
+        self._closing = True
+        self._sync_pool.shutdown(wait=False, cancel_futures=True)
+        self._notion_pool.shutdown(wait=False, cancel_futures=True)
+        if self.notion:
+            self.notion.close()
+        if self.topstepx:
+            self.topstepx.close()
         self.destroy()
 
 
@@ -26,12 +26,50 @@ Notionデータベースの推奨スキーマ:
 =========================================
 """
 
+import hashlib
 import json
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Optional, Dict, List, Any, Set
+from typing import Optional, Dict, Iterator, List, Any, Set
 from pathlib import Path
 
+from json_compat import json_loads, json_dumps_compact
+
+
+class _RateLimiter:
+    """スライディングウィンドウ方式のレート制限（period 秒あたり最大 max_calls 回）"""
+    
+    def __init__(self, max_calls: int, period: float = 1.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls: deque = deque()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """呼び出し枠が空くまで待つ"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            time.sleep(wait)
+
+
+# Notion APIのレート制限（インテグレーションごとに平均 3 req/s）
+# 複数のクライアント・スレッドから呼ばれても合計で超えないようプロセス全体で共有する
+_notion_rate_limiter = _RateLimiter(max_calls=3, period=1.0)
+
 
 class NotionRoundtripClient:
     """往復トレード用 Notion API クライアント"""
@@ -39,6 +77,28 @@ class NotionRoundtripClient:
     BASE_URL = "https://api.notion.com/v1"
     NOTION_VERSION = "2022-06-28"
     
+    # ページ作成の同時リクエスト数（送信間隔は _request のレート制限で調整）
+    WRITE_WORKERS = 5
+    
+    # レート制限・一時的なエラー時の再試行
+    RETRY_STATUS = (429, 503)
+    MAX_RETRIES = 5
+    
+    # 書き込み中の進捗を表示する最短間隔（秒）
+    PROGRESS_INTERVAL = 1.0
+    
+    # keep-alive で保持する接続数（複数アカウントの同時書き込み × WRITE_WORKERS を賄える数）
+    POOL_SIZE = 16
+    
+    # 結果（WIN / LOSS / BE）の select プロパティ（全ページで共有し、行ごとに作らない）
+    _RESULT_SELECTS = {
+        result: {"select": {"name": result}}
+        for result in ("WIN", "LOSS", "BE")
+    }
+    
+    # 内容ハッシュを保存するプロパティ（データベースに rich_text として存在する場合のみ使用）
+    HASH_PROPERTY = "Hash"
+    
     def __init__(self, api_key: str, database_id: str):
         """
         クライアントを初期化
@@ -49,19 +109,97 @@ class NotionRoundtripClient:
         """
         self.api_key = api_key
         self.database_id = database_id
+        # 最後に取得したデータベース情報（get_database で更新。プロパティの確認に使い回す）
+        self._database_schema: Optional[Dict[str, Any]] = None
+        # データベースに Hash プロパティがあるか（初回の同期時に確認）
+        self._hash_enabled: Optional[bool] = None
         self.session = requests.Session()
         self.session.headers.update({
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
             "Notion-Version": self.NOTION_VERSION
         })
+        
+        # 接続プールを並列数に合わせる（溢れた接続は破棄され、次回TLSハンドシェイクからやり直しになる）
+        # 429/503 は _request で Retry-After に従って再試行するので、ここでは接続エラーと
+        # 冪等なリクエストの 502/504 だけを再試行する（POSTの重複作成を避ける）
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_SIZE,
+            pool_maxsize=self.POOL_SIZE,
+            max_retries=Retry(
+                total=3,
+                connect=3,
+                read=0,
+                status_forcelist=(502, 504),
+                backoff_factor=0.5,
+                raise_on_status=False
+            )
+        )
+        self.session.mount("https://", adapter)
+        
+        # ページ作成用のワーカー（スレッドは最初の送信時に起動し、以降は使い回す）
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.WRITE_WORKERS,
+            thread_name_prefix="notion-write"
+        )
+        # 送信中の書き込み {ユニークキー: Future}（同じキーの同時書き込みを1回にまとめる）
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+    
+    def close(self) -> None:
+        """
+        書き込みワーカーとセッションを終了する
+        
+        まだ送信していない書き込みは取り消す（送信中のものは完了を待たない）
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+    
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        レート制限付きでリクエストを送信
+        
+        429 / 503 の場合は Retry-After（なければ指数バックオフ）だけ待って再試行する
+        json= で渡した本文は json_compat（orjson があれば使用）で1回だけシリアライズする
+        """
+        if "json" in kwargs:
+            kwargs["data"] = json_dumps_compact(kwargs.pop("json"))
+        
+        for attempt in range(self.MAX_RETRIES + 1):
+            _notion_rate_limiter.acquire()
+            response = self.session.request(method, url, **kwargs)
+            
+            if response.status_code not in self.RETRY_STATUS or attempt == self.MAX_RETRIES:
+                return response
+            
+            time.sleep(self._retry_delay(response, attempt))
+        
+        return response
+    
+    @staticmethod
+    def _retry_delay(response: requests.Response, attempt: int) -> float:
+        """再試行までの待ち時間（秒）"""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                pass
+        return min(2 ** attempt, 30) + random.uniform(0, 1)
     
     def get_database(self) -> Dict[str, Any]:
-        """データベース情報を取得"""
+        """
+        データベース情報を取得
+        
+        取得した内容は保持し、以降のプロパティの確認（Hash の有無など）では再取得しない
+        """
         url = f"{self.BASE_URL}/databases/{self.database_id}"
-        response = self.session.get(url)
+        response = self._request("GET", url)
         response.raise_for_status()
-        return response.json()
+        schema = json_loads(response.content)
+        self._database_schema = schema
+        self._hash_enabled = None
+        return schema
     
     def query_database(
         self, 
@@ -71,8 +209,15 @@ class NotionRoundtripClient:
         """
         データベースをクエリして既存のエントリを取得（ページネーション対応）
         """
+        return list(self._iter_pages(filter_obj=filter_obj, page_size=page_size))
+    
+    def _iter_pages(
+        self,
+        filter_obj: Optional[Dict] = None,
+        page_size: int = 100
+    ) -> Iterator[Dict[str, Any]]:
+        """データベースのクエリ結果を1件ずつ返す（次のページは必要になった時点で取得）"""
         url = f"{self.BASE_URL}/databases/{self.database_id}/query"
-        all_results = []
         has_more = True
         start_cursor = None
         
@@ -83,22 +228,35 @@ class NotionRoundtripClient:
             if start_cursor:
                 payload["start_cursor"] = start_cursor
             
-            response = self.session.post(url, json=payload)
+            response = self._request("POST", url, json=payload)
             response.raise_for_status()
-            data = response.json()
+            data = json_loads(response.content)
             
-            all_results.extend(data.get("results", []))
+            yield from data.get("results", [])
             has_more = data.get("has_more", False)
             start_cursor = data.get("next_cursor")
-        
-        return all_results
     
-    def get_existing_roundtrip_ids(self) -> Set[str]:
-        """既存の往復トレードID（Entry Trade ID + Exit Trade ID）を取得"""
-        pages = self.query_database()
-        existing_ids = set()
+    def get_existing_roundtrips(self, min_exit_id: Optional[int] = None) -> Dict[str, Dict[str, str]]:
+        """
+        既存の往復トレードを取得
+        
+        Args:
+            min_exit_id: 指定した場合、Exit Trade ID がこの値以上のエントリだけを取得
+                         （同期対象より古いエントリを読み飛ばす）
         
-        for page in pages:
+        Returns:
+            {"Entry Trade ID-Exit Trade ID": {"page_id": ページID, "hash": 内容ハッシュ}}
+            （Hash プロパティが空のページは hash が空文字）
+        """
+        filter_obj = None
+        if min_exit_id is not None:
+            filter_obj = {
+                "property": "Exit Trade ID",
+                "number": {"greater_than_or_equal_to": min_exit_id}
+            }
+        existing = {}
+        
+        for page in self._iter_pages(filter_obj=filter_obj):
             props = page.get("properties", {})
             
             # Entry Trade ID と Exit Trade ID の組み合わせでユニーク判定
@@ -107,9 +265,33 @@ class NotionRoundtripClient:
             
             if entry_id and exit_id:
                 unique_key = f"{entry_id}-{exit_id}"
-                existing_ids.add(unique_key)
+                hash_text = props.get(self.HASH_PROPERTY, {}).get("rich_text") or []
+                existing[unique_key] = {
+                    "page_id": page.get("id", ""),
+                    "hash": "".join(t.get("plain_text", "") for t in hash_text)
+                }
         
-        return existing_ids
+        return existing
+    
+    def get_existing_roundtrip_ids(self, min_exit_id: Optional[int] = None) -> Set[str]:
+        """既存の往復トレードID（Entry Trade ID + Exit Trade ID）を取得"""
+        return set(self.get_existing_roundtrips(min_exit_id=min_exit_id))
+    
+    def _uses_content_hash(self) -> bool:
+        """データベースに Hash プロパティ（rich_text）があるか（取得済みのデータベース情報で確認）"""
+        if self._hash_enabled is None:
+            schema = self._database_schema
+            if schema is None:
+                schema = self.get_database()
+            props = schema.get("properties", {})
+            self._hash_enabled = props.get(self.HASH_PROPERTY, {}).get("type") == "rich_text"
+        return self._hash_enabled
+    
+    @staticmethod
+    def _content_hash(properties: Dict[str, Any]) -> str:
+        """プロパティ内容のハッシュ（キー順に依存しない）"""
+        data = json.dumps(properties, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
     
     def _truncate_account_name(self, name: str, max_length: int = 50) -> str:
         """アカウント名を短縮（Notionのselectオプション用）"""
@@ -136,8 +318,27 @@ class NotionRoundtripClient:
         Returns:
             作成されたページ情報
         """
-        url = f"{self.BASE_URL}/pages"
+        return self._create_page(self._build_properties(roundtrip, account_name))
+    
+    def _account_property(self, account_name: str) -> Dict[str, Any]:
+        """Account の select プロパティ（同じアカウントの全ページで共有できる）"""
+        return {"select": {"name": self._truncate_account_name(account_name)}}
+    
+    def _build_properties(
+        self,
+        roundtrip: Dict[str, Any],
+        account_name: str,
+        account_property: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        往復トレードからページのプロパティを構築
+        
+        行ごとに変わらない値（Account / Result の select）は共有オブジェクトを使う
+        （送信前にシリアライズするだけで変更しないため共有して問題ない）
         
+        Args:
+            account_property: _account_property で作成済みの Account プロパティ（省略時は作成）
+        """
         # 結果を判定
         pnl = roundtrip.get("pnl", 0)
         if pnl > 0:
@@ -161,9 +362,7 @@ class NotionRoundtripClient:
             "Name": {
                 "title": [{"text": {"content": title}}]
             },
-            "Account": {
-                "select": {"name": self._truncate_account_name(account_name)}
-            },
+            "Account": account_property or self._account_property(account_name),
             "Contract": {
                 "select": {"name": roundtrip.get("contract", "Other")}
             },
@@ -194,9 +393,7 @@ class NotionRoundtripClient:
             "Duration": {
                 "rich_text": [{"text": {"content": roundtrip.get("duration_formatted", "")}}]
             },
-            "Result": {
-                "select": {"name": result}
-            },
+            "Result": self._RESULT_SELECTS[result],
             "Entry Trade ID": {
                 "number": entry_info.get("trade_id", 0)
             },
@@ -219,68 +416,181 @@ class NotionRoundtripClient:
                 "date": {"start": exit_ts}
             }
         
+        return properties
+    
+    def _create_page(self, properties: Dict[str, Any]) -> Dict[str, Any]:
+        """データベースにページを作成"""
+        url = f"{self.BASE_URL}/pages"
         payload = {
             "parent": {"database_id": self.database_id},
             "properties": properties
         }
         
-        response = self.session.post(url, json=payload)
+        response = self._request("POST", url, json=payload)
+        
+        if not response.ok:
+            print(f"   [ERROR] {response.status_code}: {response.text}")
+            response.raise_for_status()
+        
+        return json_loads(response.content)
+    
+    def _update_page(self, page_id: str, properties: Dict[str, Any]) -> Dict[str, Any]:
+        """既存ページのプロパティを更新"""
+        url = f"{self.BASE_URL}/pages/{page_id}"
+        
+        response = self._request("PATCH", url, json={"properties": properties})
         
         if not response.ok:
             print(f"   [ERROR] {response.status_code}: {response.text}")
             response.raise_for_status()
         
-        return response.json()
+        return json_loads(response.content)
+    
+    @staticmethod
+    def _roundtrip_key(roundtrip: Dict[str, Any]) -> str:
+        """往復トレードのユニークキー（Entry Trade ID + Exit Trade ID）"""
+        entry_id = roundtrip.get("entry", {}).get("trade_id", 0)
+        exit_id = roundtrip.get("exit", {}).get("trade_id", 0)
+        return f"{entry_id}-{exit_id}"
+    
+    def _run_writes(self, jobs: List[tuple], stats: Dict[str, int]) -> Dict[str, int]:
+        """
+        書き込みジョブ [(統計キー, ユニークキー, 関数, 引数), ...] を並列に実行
+        
+        同じユニークキーの書き込みが他の同期で送信中なら新たに送らず、その完了を待つ
+        （重複ページの作成を防ぐ。この場合はスキップとして数える）
+        統計と進捗表示は完了した順にこのスレッドで集計する
+        （進捗は PROGRESS_INTERVAL 秒に1回と完了時だけ表示）
+        """
+        if not jobs:
+            return stats
+        
+        futures = {}
+        for kind, key, func, args in jobs:
+            future, submitted = self._submit_write(key, func, args)
+            if future in futures:
+                # 同じ呼び出し内でキーが重複している
+                stats["skipped"] = stats.get("skipped", 0) + 1
+                continue
+            futures[future] = (kind if submitted else "skipped", key)
+        
+        total = len(futures)
+        next_progress = time.monotonic() + self.PROGRESS_INTERVAL
+        
+        for done, future in enumerate(as_completed(futures), 1):
+            kind, key = futures[future]
+            try:
+                future.result()
+                stats[kind] = stats.get(kind, 0) + 1
+            except Exception as e:
+                print(f"   [ERROR] Roundtrip {key}: {e}")
+                stats["errors"] += 1
+            
+            # 進捗表示
+            if done == total or time.monotonic() >= next_progress:
+                print(f"   処理中: {done}/{total}")
+                next_progress = time.monotonic() + self.PROGRESS_INTERVAL
+        
+        return stats
+    
+    def _submit_write(self, key: str, func, args: tuple):
+        """
+        書き込みをワーカーに投入
+        
+        Returns:
+            (Future, 新たに投入したか) のタプル
+            同じキーの書き込みが送信中ならその Future を返す
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._executor.submit(func, *args)
+            self._inflight[key] = future
+        
+        # 完了済みなら即座に呼ばれるため、ロックの外で登録する
+        future.add_done_callback(lambda f, k=key: self._forget_inflight(k, f))
+        return future, True
+    
+    def _forget_inflight(self, key: str, future: Future) -> None:
+        with self._inflight_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
     
     def sync_roundtrips(
         self,
         roundtrips: List[Dict[str, Any]],
         account_name: str,
-        skip_existing: bool = True
+        skip_existing: bool = True,
+        dry_run: bool = False
     ) -> Dict[str, int]:
         """
         往復トレードデータをNotionに同期
         
+        既存エントリとの差分（作成 / 更新 / スキップ）を先に確定してから、まとめて送信する
+        データベースに Hash プロパティ（rich_text）がある場合は内容ハッシュを保存し、
+        既存エントリの内容が変わっていればそのページを更新する（同じなら何もしない）
+        
         Args:
             roundtrips: 往復トレードのリスト
             account_name: アカウント名
             skip_existing: 既存のトレードをスキップするか
+            dry_run: True の場合は差分を表示するだけで書き込まない
+                     （created / updated は書き込む予定の件数）
         
         Returns:
-            結果の統計 {"created": n, "skipped": m, "errors": e}
+            結果の統計 {"created": n, "updated": u, "skipped": m, "errors": e}
         """
-        stats = {"created": 0, "skipped": 0, "errors": 0}
+        stats = {"created": 0, "updated": 0, "skipped": 0, "errors": 0}
         
-        # 既存のIDを取得
-        existing_ids = set()
-        if skip_existing:
+        # 既存のエントリを取得（今回のエグジットより古いエントリは照合不要なので取得しない）
+        existing = {}
+        if skip_existing and roundtrips:
             print("   既存のエントリを確認中...")
-            existing_ids = self.get_existing_roundtrip_ids()
-            print(f"   {len(existing_ids)} 件の既存エントリを検出")
-        
-        total = len(roundtrips)
-        for i, rt in enumerate(roundtrips):
-            # ユニークキーを生成
-            entry_id = rt.get("entry", {}).get("trade_id", 0)
-            exit_id = rt.get("exit", {}).get("trade_id", 0)
-            unique_key = f"{entry_id}-{exit_id}"
-            
-            # 進捗表示
-            if (i + 1) % 10 == 0 or i == 0:
-                print(f"   処理中: {i + 1}/{total}")
-            
-            # 既存チェック
-            if unique_key in existing_ids:
+            min_exit_id = min(rt.get("exit", {}).get("trade_id", 0) for rt in roundtrips)
+            existing = self.get_existing_roundtrips(min_exit_id=min_exit_id)
+            print(f"   {len(existing)} 件の既存エントリを検出")
+        
+        use_hash = bool(roundtrips) and self._uses_content_hash()
+        
+        # 既存チェック（作成 / 更新 / スキップに振り分け）
+        account_property = self._account_property(account_name)
+        jobs = []
+        for rt in roundtrips:
+            key = self._roundtrip_key(rt)
+            current = existing.get(key)
+            if current is not None and not use_hash:
                 stats["skipped"] += 1
                 continue
             
-            try:
-                self.create_roundtrip_entry(rt, account_name)
-                stats["created"] += 1
-            except Exception as e:
-                print(f"   [ERROR] Roundtrip {unique_key}: {e}")
-                stats["errors"] += 1
+            properties = self._build_properties(rt, account_name, account_property)
+            
+            if use_hash:
+                content_hash = self._content_hash(properties)
+                if current is not None and current.get("hash") == content_hash:
+                    stats["skipped"] += 1
+                    continue
+                properties[self.HASH_PROPERTY] = {
+                    "rich_text": [{"text": {"content": content_hash}}]
+                }
+                if current is not None:
+                    jobs.append(("updated", key, self._update_page, (current["page_id"], properties)))
+                    continue
+            
+            jobs.append(("created", key, self._create_page, (properties,)))
         
+        to_create = sum(1 for job in jobs if job[0] == "created")
+        to_update = len(jobs) - to_create
+        print(f"   差分: 作成 {to_create} / 更新 {to_update} / スキップ {stats['skipped']}")
+        
+        if dry_run:
+            for kind, key, _, _ in jobs:
+                print(f"   [DRY RUN] {'作成' if kind == 'created' else '更新'}: {key}")
+            stats["created"] = to_create
+            stats["updated"] = to_update
+            return stats
+        
+        self._run_writes(jobs, stats)
         return stats
 
 
@@ -296,9 +606,13 @@ def load_credentials(path: str = "credentials.json") -> Dict[str, Any]:
     if not creds_path.exists():
         raise FileNotFoundError(f"認証情報ファイルが見つかりません: {path}")
     
-    with open(creds_path, 'r', encoding='utf-8') as f:
-        creds = json.load(f)
-    
+    return normalize_credentials(json_loads(creds_path.read_bytes()))
+
+
+def normalize_credentials(creds: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    読み込み済みの認証情報を新フォーマット（topstepx/notion構造）に揃える
+    """
     # 新フォーマット（topstepx/notion構造）
     if "topstepx" in creds and "notion" in creds:
         return creds
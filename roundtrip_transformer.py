@@ -14,20 +14,42 @@ TopstepX APIの片道トレードデータを往復トレードデータに変
   - 統計情報（勝率、P&L、プロフィットファクター等）
 """
 
-import json
+import functools
+import sys
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
-from collections import defaultdict
+from collections import defaultdict, deque
 
+from json_compat import json_loads, json_dumps
 
+
+# タイムスタンプの書式（先に一致したものを採用）
+_TS_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S.%f%z",
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%dT%H:%M:%SZ",
+)
+# 小数秒を含まない場合に試す書式（%f の書式は必ず失敗するため除外）
+_TS_FORMATS_NO_FRACTION = tuple(fmt for fmt in _TS_FORMATS if "%f" not in fmt)
+# Python 3.11 以降の fromisoformat は "Z" や7桁以上の小数秒を含むISO 8601をそのまま扱える
+_FULL_ISOFORMAT = sys.version_info >= (3, 11)
+
+
+@functools.lru_cache(maxsize=1 << 16)
 def parse_timestamp(ts: str) -> datetime:
-    """ISO形式のタイムスタンプをパース"""
-    formats = [
-        "%Y-%m-%dT%H:%M:%S.%f%z",
-        "%Y-%m-%dT%H:%M:%S%z",
-        "%Y-%m-%dT%H:%M:%S.%fZ",
-        "%Y-%m-%dT%H:%M:%SZ",
-    ]
+    """
+    ISO形式のタイムスタンプをパース
+    
+    同じ文字列は何度も渡されるため結果をキャッシュする（datetime は不変なので共有して問題ない）
+    """
+    if _FULL_ISOFORMAT:
+        try:
+            return datetime.fromisoformat(ts)
+        except ValueError:
+            pass
+    
+    formats = _TS_FORMATS if '.' in ts else _TS_FORMATS_NO_FRACTION
     for fmt in formats:
         try:
             return datetime.strptime(ts, fmt)
@@ -41,14 +63,21 @@ def parse_timestamp(ts: str) -> datetime:
     return datetime.fromisoformat(ts)
 
 
+# 既知のシンボル（先に一致したものを採用するため MNQ は NQ より前に置く）
+_KNOWN_SYMBOLS = ("MNQ", "MES", "NQ", "ES", "MCL", "MGC", "CL", "GC", "M2K", "MYM")
+
+
+@functools.lru_cache(maxsize=256)
 def extract_contract_symbol(contract_id: str) -> str:
     """
     契約IDからシンボルを抽出
     例: CON.F.US.MNQ.Z25 -> MNQ
+    
+    同じ契約IDのトレードが続くため結果をキャッシュする
     """
-    known_symbols = ["MNQ", "MES", "NQ", "ES", "MCL", "MGC", "CL", "GC", "M2K", "MYM"]
-    for symbol in known_symbols:
-        if symbol in contract_id.upper():
+    upper_id = contract_id.upper()
+    for symbol in _KNOWN_SYMBOLS:
+        if symbol in upper_id:
             return symbol
     parts = contract_id.split('.')
     if len(parts) >= 4:
@@ -70,6 +99,64 @@ def format_duration(seconds: int) -> str:
         return f"{hours}時間{minutes}分"
 
 
+class _EntryQueue:
+    """
+    未決済エントリーの待ち行列（時系列順）
+    
+    (サイズ, side) ごとの deque で索引し、反対sideの最古エントリーを O(1) で取り出す
+    取り出したエントリーは各 deque から遅延削除する
+    """
+    
+    def __init__(self, entries: List[Dict]):
+        self._entries = entries
+        self._consumed = [False] * len(entries)
+        self._remaining = len(entries)
+        self._order = deque(range(len(entries)))
+        self._by_size: Dict[Any, Dict[Any, deque]] = defaultdict(dict)
+        for i, entry in enumerate(entries):
+            sides = self._by_size[entry.get('size')]
+            sides.setdefault(entry.get('side'), deque()).append(i)
+    
+    def __len__(self) -> int:
+        return self._remaining
+    
+    def _take(self, index: int) -> Dict:
+        self._consumed[index] = True
+        self._remaining -= 1
+        return self._entries[index]
+    
+    def pop_match(self, exit_side: Any, exit_size: Any) -> Optional[Dict]:
+        """反対のside・同じサイズのうち最古のエントリーを取り出す（なければ None）"""
+        sides = self._by_size.get(exit_size)
+        if not sides:
+            return None
+        
+        consumed = self._consumed
+        best = None
+        for side, indices in sides.items():
+            if side == exit_side:
+                continue
+            while indices and consumed[indices[0]]:
+                indices.popleft()
+            if indices and (best is None or indices[0] < best):
+                best = indices[0]
+        
+        return None if best is None else self._take(best)
+    
+    def pop_oldest(self) -> Dict:
+        """最古のエントリーを取り出す"""
+        order = self._order
+        consumed = self._consumed
+        while consumed[order[0]]:
+            order.popleft()
+        return self._take(order.popleft())
+    
+    def remaining(self) -> List[Dict]:
+        """未決済のエントリー（時系列順）"""
+        consumed = self._consumed
+        return [entry for i, entry in enumerate(self._entries) if not consumed[i]]
+
+
 class RoundtripTransformer:
     """往復トレード変換クラス"""
     
@@ -78,6 +165,12 @@ class RoundtripTransformer:
         self.open_positions: List[Dict[str, Any]] = []
         self.unmatched_exits: List[Dict[str, Any]] = []
     
+    def reset(self):
+        """前回の変換結果をクリア（インスタンスを使い回す場合用）"""
+        self.roundtrips = []
+        self.open_positions = []
+        self.unmatched_exits = []
+    
     def transform(self, trades: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         片道トレードを往復トレードに変換
@@ -88,9 +181,7 @@ class RoundtripTransformer:
         Returns:
             往復トレードのリスト
         """
-        self.roundtrips = []
-        self.open_positions = []
-        self.unmatched_exits = []
+        self.reset()
         
         # 契約ごとにトレードをグループ化
         trades_by_contract = defaultdict(list)
@@ -104,22 +195,27 @@ class RoundtripTransformer:
             # 時系列でソート
             contract_trades.sort(key=lambda x: x.get('creationTimestamp', ''))
             
-            # エントリーとエグジットを分離
-            entries = [t for t in contract_trades if t.get('profitAndLoss') is None]
-            exits = [t for t in contract_trades if t.get('profitAndLoss') is not None]
+            # エントリーとエグジットを1回の走査で分離
+            entries = []
+            exits = []
+            for t in contract_trades:
+                if t.get('profitAndLoss') is None:
+                    entries.append(t)
+                else:
+                    exits.append(t)
             
-            entry_queue = list(entries)
+            entry_queue = _EntryQueue(entries)
             
             for exit_trade in exits:
                 if not entry_queue:
                     self.unmatched_exits.append(exit_trade)
                     continue
                 
-                # 対応するエントリーを探す
-                entry_trade = self._find_matching_entry(entry_queue, exit_trade)
+                # 対応するエントリーを探す（反対のside、同じサイズ）
+                entry_trade = entry_queue.pop_match(exit_trade.get('side'), exit_trade.get('size'))
                 
                 if entry_trade is None:
-                    entry_trade = entry_queue.pop(0)
+                    entry_trade = entry_queue.pop_oldest()
                 
                 roundtrip_id += 1
                 roundtrip = self._create_roundtrip(
@@ -128,26 +224,13 @@ class RoundtripTransformer:
                 self.roundtrips.append(roundtrip)
             
             # 未決済のエントリーを記録
-            self.open_positions.extend(entry_queue)
+            self.open_positions.extend(entry_queue.remaining())
         
         # 時系列でソート
         self.roundtrips.sort(key=lambda x: x['exit']['timestamp'])
         
         return self.roundtrips
     
-    def _find_matching_entry(
-        self, 
-        entry_queue: List[Dict], 
-        exit_trade: Dict
-    ) -> Optional[Dict]:
-        """マッチするエントリーを検索"""
-        for i, entry in enumerate(entry_queue):
-            # 反対のside、同じサイズ
-            if (entry.get('side') != exit_trade.get('side') and 
-                entry.get('size') == exit_trade.get('size')):
-                return entry_queue.pop(i)
-        return None
-    
     def _create_roundtrip(
         self, 
         roundtrip_id: int,
@@ -208,66 +291,84 @@ class RoundtripTransformer:
         }
     
     def get_statistics(self) -> Dict[str, Any]:
-        """往復トレードの統計を計算"""
+        """往復トレードの統計を1回の走査で計算"""
         if not self.roundtrips:
             return {}
         
         total = len(self.roundtrips)
-        winners = [rt for rt in self.roundtrips if rt['pnl'] > 0]
-        losers = [rt for rt in self.roundtrips if rt['pnl'] < 0]
-        breakeven = [rt for rt in self.roundtrips if rt['pnl'] == 0]
+        wins = losses = breakeven = 0
+        total_pnl = total_fees = 0
+        gross_profit = loss_sum = 0
+        max_pnl = float('-inf')
+        min_pnl = float('inf')
+        total_duration = 0
         
-        total_pnl = sum(rt['pnl'] for rt in self.roundtrips)
-        total_fees = sum(rt['total_fees'] for rt in self.roundtrips)
+        # 契約別・方向別の集計も同じループで行う
+        new_group = lambda: {"count": 0, "pnl": 0.0, "wins": 0, "losses": 0}
+        by_contract = defaultdict(new_group)
+        by_direction = defaultdict(new_group)
+        
+        # 全統計を1回の走査で集計
+        for rt in self.roundtrips:
+            pnl = rt['pnl']
+            total_pnl += pnl
+            total_fees += rt['total_fees']
+            total_duration += rt['duration_seconds']
+            if pnl > max_pnl:
+                max_pnl = pnl
+            if pnl < min_pnl:
+                min_pnl = pnl
+            
+            contract_group = by_contract[rt.get('contract')]
+            direction_group = by_direction[rt.get('direction')]
+            contract_group["count"] += 1
+            contract_group["pnl"] += pnl
+            direction_group["count"] += 1
+            direction_group["pnl"] += pnl
+            
+            if pnl > 0:
+                wins += 1
+                gross_profit += pnl
+                contract_group["wins"] += 1
+                direction_group["wins"] += 1
+            elif pnl < 0:
+                losses += 1
+                loss_sum += pnl
+                contract_group["losses"] += 1
+                direction_group["losses"] += 1
+            else:
+                breakeven += 1
         
-        avg_win = sum(rt['pnl'] for rt in winners) / len(winners) if winners else 0
-        avg_loss = sum(rt['pnl'] for rt in losers) / len(losers) if losers else 0
+        avg_win = gross_profit / wins if wins else 0
+        avg_loss = loss_sum / losses if losses else 0
         
-        gross_profit = sum(rt['pnl'] for rt in winners)
-        gross_loss = abs(sum(rt['pnl'] for rt in losers))
+        gross_loss = abs(loss_sum)
         profit_factor = round(gross_profit / gross_loss, 2) if gross_loss > 0 else 0
         
-        avg_duration = sum(rt['duration_seconds'] for rt in self.roundtrips) / total
-        
-        # 契約別・方向別の集計
-        by_contract = self._group_stats('contract')
-        by_direction = self._group_stats('direction')
+        avg_duration = total_duration / total
         
         return {
             "total_roundtrips": total,
-            "winning_trades": len(winners),
-            "losing_trades": len(losers),
-            "breakeven_trades": len(breakeven),
-            "win_rate": round(len(winners) / total * 100, 1),
+            "winning_trades": wins,
+            "losing_trades": losses,
+            "breakeven_trades": breakeven,
+            "win_rate": round(wins / total * 100, 1),
             "total_pnl": round(total_pnl, 2),
             "total_fees": round(total_fees, 2),
             "total_net_pnl": round(total_pnl - total_fees, 2),
             "avg_win": round(avg_win, 2),
             "avg_loss": round(avg_loss, 2),
             "profit_factor": profit_factor,
-            "max_win": round(max(rt['pnl'] for rt in self.roundtrips), 2),
-            "max_loss": round(min(rt['pnl'] for rt in self.roundtrips), 2),
+            "max_win": round(max_pnl, 2),
+            "max_loss": round(min_pnl, 2),
             "avg_duration_seconds": int(avg_duration),
             "avg_duration_formatted": format_duration(int(avg_duration)),
-            "by_contract": by_contract,
-            "by_direction": by_direction,
+            "by_contract": dict(by_contract),
+            "by_direction": dict(by_direction),
             "open_positions": len(self.open_positions),
             "unmatched_exits": len(self.unmatched_exits)
         }
     
-    def _group_stats(self, group_key: str) -> Dict[str, Dict]:
-        """指定キーでグループ化した統計"""
-        groups = defaultdict(lambda: {"count": 0, "pnl": 0.0, "wins": 0, "losses": 0})
-        for rt in self.roundtrips:
-            key = rt.get(group_key)
-            groups[key]["count"] += 1
-            groups[key]["pnl"] += rt['pnl']
-            if rt['pnl'] > 0:
-                groups[key]["wins"] += 1
-            elif rt['pnl'] < 0:
-                groups[key]["losses"] += 1
-        return dict(groups)
-    
     def to_dict(self) -> Dict[str, Any]:
         """結果を辞書形式で出力"""
         return {
@@ -314,8 +415,8 @@ if __name__ == "__main__":
         input_file = "trade_data_raw.json"
     
     try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(input_file, "rb") as f:
+            data = json_loads(f.read())
     except FileNotFoundError:
         print(f"❌ ファイルが見つかりません: {input_file}")
         sys.exit(1)
@@ -345,7 +446,7 @@ if __name__ == "__main__":
     }
     
     output_file = input_file.replace(".json", "_roundtrips.json")
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    with open(output_file, "wb") as f:
+        f.write(json_dumps(output))
     
     print(f"\n💾 保存: {output_file}")
\ No newline at end of file
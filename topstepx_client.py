@@ -3,12 +3,71 @@ TopstepX API Client
 ProjectX Gateway APIを使用してTopstepXに接続するクライアント
 """
 
-import json
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterator, Callable, Tuple
 from pathlib import Path
 
+from json_compat import json_loads, json_dumps, json_dumps_compact
+
+
+logger = logging.getLogger(__name__)
+
+# パラメータのないリクエストの本文（毎回シリアライズしない）
+_EMPTY_BODY = b"{}"
+
+# アイドル中の接続が途中の機器に切られないよう、TCP keep-alive を有効にする
+# （30秒アイドルで10秒ごとに確認、3回応答がなければ切断。未対応のOSでは設定できる項目だけ使う）
+_KEEPALIVE_SOCKET_OPTIONS = list(HTTPConnection.default_socket_options) + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+] + [
+    (socket.IPPROTO_TCP, getattr(socket, name), value)
+    for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+    if hasattr(socket, name)
+]
+
+
+class CircuitOpenError(Exception):
+    """TopstepX APIの障害が続いているため、送信せずに失敗させたことを表す例外"""
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """TCP keep-alive を有効にした接続プールを使うアダプター"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault("socket_options", _KEEPALIVE_SOCKET_OPTIONS)
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _resolve_window(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+) -> Tuple[datetime, datetime]:
+    """省略された期間を補完（終了: 現在、開始: 終了の30日前。現在時刻は1回だけ取得）"""
+    if end_date is None:
+        end_date = datetime.now(timezone.utc)
+    if start_date is None:
+        start_date = end_date - timedelta(days=30)
+    return start_date, end_date
+
+
+def _to_iso_z(dt: datetime) -> str:
+    """ISO 8601形式（Z形式、ミリ秒は0固定）に変換（strftime より速い整数フォーマット）"""
+    return (
+        f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}"
+        f"T{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}.000Z"
+    )
+
 
 class TopstepXClient:
     """TopstepX API クライアント"""
@@ -16,22 +75,132 @@ class TopstepXClient:
     # TopstepX用のAPI URL
     BASE_URL = "https://api.topstepx.com/api"
     
-    def __init__(self, credentials_path: str = "credentials.json"):
+    # fetch_all / get_trades_bulk で同時に実行するリクエスト数
+    FETCH_WORKERS = 8
+    
+    # keep-alive で保持する接続数（fetch_all の並列数より多めにする）
+    POOL_SIZE = 32
+    
+    # 取得結果を再利用する秒数（アカウントは残高を含むので長くしすぎない。同期後は破棄される）
+    CACHE_TTL = {
+        "accounts": 30.0,
+        "positions": 5.0,
+        "orders": 5.0,
+    }
+    
+    # セッショントークンの保存先と、再利用する秒数（期限切れ前に取り直すよう短めにする）
+    TOKEN_CACHE_PATH = Path.home() / ".topstepx_token.json"
+    TOKEN_TTL = 3500
+    
+    # リクエストのタイムアウト (接続, 読み取り) 秒（応答のないAPIで待ち続けず、失敗として数える）
+    REQUEST_TIMEOUT = (5, 30)
+    
+    # 再試行しても失敗する状態が BREAKER_THRESHOLD 回以上・BREAKER_MIN_DOWN 秒以上続いたら
+    # APIが停止しているとみなし、BREAKER_OPEN 秒間は送信せずにすぐ失敗させる
+    BREAKER_THRESHOLD = 3
+    BREAKER_MIN_DOWN = 30.0
+    BREAKER_OPEN = 30.0
+    
+    def __init__(
+        self,
+        credentials_path: str = "credentials.json",
+        session: Optional[requests.Session] = None,
+        use_token_cache: bool = True
+    ):
         """
         クライアントを初期化
         
         Args:
             credentials_path: 認証情報JSONファイルのパス
+            session: 使用するHTTPセッション（省略時は新規作成）
+            use_token_cache: 保存済みのセッショントークンを再利用するか
         """
         self.credentials_path = Path(credentials_path)
         self.username: Optional[str] = None
         self.api_key: Optional[str] = None
-        self.session_token: Optional[str] = None
-        self.session = requests.Session()
+        self._init_state(session, use_token_cache)
         
         # 認証情報を読み込み
         self._load_credentials()
     
+    def _init_state(self, session: Optional[requests.Session], use_token_cache: bool) -> None:
+        """認証情報以外の内部状態を初期化"""
+        self.session_token: Optional[str] = None
+        # 渡されたセッションは呼び出し側のものなので close() では閉じない
+        self._owns_session = session is None
+        self.session = session if session is not None else self._create_session()
+        self.use_token_cache = use_token_cache
+        # 渡されたセッションでも必ず適用する（用途に応じて変更可）
+        self.timeout = self.REQUEST_TIMEOUT
+        # リクエストごとに付けるヘッダー（渡されたセッションのヘッダーは変更しない）
+        # 本文はシリアライズ済みのバイト列で送るので Content-Type もここで指定する
+        # 並列リクエスト中に書き換えないよう、変更時は新しい辞書に差し替える
+        self._headers: Dict[str, str] = {"Content-Type": "application/json"}
+        self._auth_body: Optional[bytes] = None
+        self._auth_lock = threading.Lock()
+        self._breaker_lock = threading.Lock()
+        self._breaker_fails = 0
+        self._breaker_first_fail = 0.0
+        self._breaker_open_until = 0.0
+        self._cache: Dict[Tuple[str, Any], Tuple[float, List[Dict[str, Any]]]] = {}
+        self._cache_lock = threading.Lock()
+    
+    @classmethod
+    def from_api_key(
+        cls,
+        username: str,
+        api_key: str,
+        session: Optional[requests.Session] = None,
+        use_token_cache: bool = True
+    ) -> "TopstepXClient":
+        """
+        認証情報を直接指定してクライアントを作成（認証情報ファイルは読まない）
+        
+        Args:
+            username: TopstepXのユーザー名
+            api_key: APIキー
+            session: 使用するHTTPセッション（省略時は新規作成）
+            use_token_cache: 保存済みのセッショントークンを再利用するか
+        """
+        client = cls.__new__(cls)
+        client.credentials_path = None
+        client.username = username
+        client.api_key = api_key
+        client._init_state(session, use_token_cache)
+        return client
+    
+    def close(self) -> None:
+        """このクライアントが作成したセッションを閉じ、プール中の接続を解放する"""
+        if self._owns_session:
+            self.session.close()
+    
+    def __enter__(self) -> "TopstepXClient":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    @classmethod
+    def _create_session(cls) -> requests.Session:
+        """接続プールと再試行を設定したHTTPセッションを作成"""
+        session = requests.Session()
+        # TopstepX の検索系APIはPOSTでも読み取りのみなので、一時的な 429/5xx は再試行してよい
+        # （429/503 は Retry-After があればそれに従い、なければ指数バックオフ）
+        adapter = _KeepAliveAdapter(
+            pool_connections=cls.POOL_SIZE,
+            pool_maxsize=cls.POOL_SIZE,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["POST"]),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        )
+        session.mount("https://", adapter)
+        return session
+    
     def _load_credentials(self) -> None:
         """認証情報をJSONファイルから読み込む"""
         if not self.credentials_path.exists():
@@ -40,8 +209,7 @@ class TopstepXClient:
                 f"credentials.example.json を参考に credentials.json を作成してください。"
             )
         
-        with open(self.credentials_path, 'r', encoding='utf-8') as f:
-            creds = json.load(f)
+        creds = json_loads(self.credentials_path.read_bytes())
         
         self.username = creds.get('username')
         self.api_key = creds.get('api_key')
@@ -49,34 +217,158 @@ class TopstepXClient:
         if not self.username or not self.api_key:
             raise ValueError("認証情報ファイルに username と api_key が必要です")
     
+    def _key_fingerprint(self) -> str:
+        """保存したトークンがどの認証情報のものか判別するための値（APIキー自体は保存しない）"""
+        return hashlib.blake2b(f"{self.username}\0{self.api_key}".encode(), digest_size=16).hexdigest()
+    
+    def _set_token(self, token: Optional[str]) -> None:
+        """セッショントークンを設定し、以降のリクエストのヘッダーに反映"""
+        self.session_token = token
+        headers = {k: v for k, v in self._headers.items() if k != "Authorization"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self._headers = headers
+    
+    def _load_cached_token(self) -> bool:
+        """保存済みのトークンが同じ認証情報のもので期限内なら使う（使えたら True）"""
+        try:
+            cache = json_loads(self.TOKEN_CACHE_PATH.read_bytes())
+        except (OSError, ValueError):
+            return False
+        
+        if cache.get("key") != self._key_fingerprint():
+            return False
+        token = cache.get("token")
+        if not token or cache.get("expires_at", 0) <= time.time():
+            return False
+        
+        self._set_token(token)
+        return True
+    
+    def _save_cached_token(self) -> None:
+        """トークンを本人だけが読めるファイルに保存（一時ファイル経由で置き換え）"""
+        path = self.TOKEN_CACHE_PATH
+        tmp_path = path.with_suffix(".json.tmp")
+        try:
+            # 権限が緩いまま残った一時ファイルを再利用しないよう、消してから新規作成する
+            try:
+                tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(json_dumps({
+                    "key": self._key_fingerprint(),
+                    "token": self.session_token,
+                    "expires_at": time.time() + self.TOKEN_TTL
+                }))
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+    
+    def invalidate_token_cache(self) -> None:
+        """保存済みのトークンを削除"""
+        try:
+            self.TOKEN_CACHE_PATH.unlink()
+        except OSError:
+            pass
+    
+    def ensure_authenticated(self) -> None:
+        """
+        トークンがなければ認証する
+        
+        保存済みのトークンが期限内であれば、認証APIを呼ばずにそれを使う
+        """
+        if self.session_token:
+            return
+        if self.use_token_cache and self._load_cached_token():
+            return
+        self.authenticate()
+    
+    def _send(self, url: str, body: bytes) -> requests.Response:
+        """
+        サーキットブレーカーを通してPOSTする
+        
+        アダプターの再試行を使い切っても接続エラー・429・5xx の場合は失敗として数え、
+        BREAKER_THRESHOLD 回以上の失敗が BREAKER_MIN_DOWN 秒以上続いたら、
+        BREAKER_OPEN 秒間は送信せずに CircuitOpenError を送出する
+        """
+        with self._breaker_lock:
+            wait = self._breaker_open_until - time.monotonic()
+        if wait > 0:
+            raise CircuitOpenError(f"TopstepX APIが応答しないため送信を停止中です（あと{wait:.0f}秒）")
+        
+        try:
+            response = self.session.post(url, data=body, headers=self._headers, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            self._record_failure()
+            raise
+        
+        if response.status_code == 429 or response.status_code >= 500:
+            self._record_failure()
+        else:
+            with self._breaker_lock:
+                self._breaker_fails = 0
+        return response
+    
+    def _record_failure(self) -> None:
+        """失敗を数え、障害が続いていればブレーカーを開く"""
+        now = time.monotonic()
+        with self._breaker_lock:
+            if self._breaker_fails == 0:
+                self._breaker_first_fail = now
+            self._breaker_fails += 1
+            if (self._breaker_fails >= self.BREAKER_THRESHOLD
+                    and now - self._breaker_first_fail >= self.BREAKER_MIN_DOWN):
+                self._breaker_open_until = now + self.BREAKER_OPEN
+    
+    def _post(self, url: str, body: bytes) -> requests.Response:
+        """
+        シリアライズ済みの本文をAPIにPOSTする
+        
+        401 が返った場合はトークンが失効したとみなし、認証し直して1回だけ再送する
+        """
+        token = self.session_token
+        response = self._send(url, body)
+        if response.status_code != 401 or not self.api_key:
+            return response
+        
+        # 並列リクエストが同時に 401 を受けても、認証し直すのは1回だけ
+        with self._auth_lock:
+            if self.session_token == token:
+                if self.use_token_cache:
+                    self.invalidate_token_cache()
+                self.authenticate()
+        return self._send(url, body)
+    
     def authenticate(self) -> Dict[str, Any]:
         """
         APIキーを使用して認証し、セッショントークンを取得
         
+        use_token_cache が有効な場合、取得したトークンを保存して次回以降に再利用する
+        
         Returns:
             認証レスポンス
         """
         url = f"{self.BASE_URL}/Auth/loginKey"
-        payload = {
-            "userName": self.username,
-            "apiKey": self.api_key
-        }
         
-        response = self.session.post(
-            url,
-            json=payload,
-            headers={"Content-Type": "application/json"}
-        )
+        # 認証情報は変わらないので本文は最初の認証時に1回だけ作る（401 での再認証でも使い回す）
+        if self._auth_body is None:
+            self._auth_body = json_dumps_compact({
+                "userName": self.username,
+                "apiKey": self.api_key
+            })
+        
+        response = self._send(url, self._auth_body)
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         
         if data.get('success'):
-            self.session_token = data.get('token')
             # 以降のリクエストにトークンを設定
-            self.session.headers.update({
-                "Authorization": f"Bearer {self.session_token}"
-            })
+            self._set_token(data.get('token'))
+            if self.use_token_cache:
+                self._save_cached_token()
             print("✅ 認証成功")
         else:
             error_msg = data.get('errorMessage', '不明なエラー')
@@ -84,23 +376,59 @@ class TopstepXClient:
         
         return data
     
+    def _cached(
+        self,
+        endpoint: str,
+        key: Any,
+        fetch: Callable[[], List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        CACHE_TTL 秒以内に取得済みならその結果を返し、なければ fetch で取得して保存
+        
+        呼び出し側がリストを変更してもキャッシュが壊れないよう、コピーを返す
+        """
+        cache_key = (endpoint, key)
+        with self._cache_lock:
+            entry = self._cache.get(cache_key)
+        if entry is not None and time.monotonic() - entry[0] < self.CACHE_TTL[endpoint]:
+            return list(entry[1])
+        
+        value = fetch()
+        with self._cache_lock:
+            self._cache[cache_key] = (time.monotonic(), value)
+        return list(value)
+    
+    def invalidate(self, endpoint: Optional[str] = None) -> None:
+        """
+        キャッシュを破棄する
+        
+        Args:
+            endpoint: "accounts" / "positions" / "orders"（省略時はすべて）
+        """
+        with self._cache_lock:
+            if endpoint is None:
+                self._cache.clear()
+            else:
+                for cache_key in [k for k in self._cache if k[0] == endpoint]:
+                    del self._cache[cache_key]
+    
     def get_accounts(self) -> List[Dict[str, Any]]:
         """
-        利用可能なアカウント一覧を取得
+        利用可能なアカウント一覧を取得（CACHE_TTL["accounts"] 秒間は前回の結果を返す）
         
         Returns:
             アカウント情報のリスト
         """
+        return self._cached("accounts", None, self._fetch_accounts)
+    
+    def _fetch_accounts(self) -> List[Dict[str, Any]]:
+        """アカウント一覧をAPIから取得"""
         url = f"{self.BASE_URL}/Account/search"
         
-        response = self.session.post(
-            url,
-            json={},
-            headers={"Content-Type": "application/json"}
-        )
+        response = self._post(url, _EMPTY_BODY)
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         
         if data.get('success'):
             return data.get('accounts', [])
@@ -125,40 +453,109 @@ class TopstepXClient:
         Returns:
             トレード情報のリスト
         """
-        url = f"{self.BASE_URL}/Trade/search"
+        return list(self.iter_trades(account_id, start_date, end_date))
+    
+    def get_trades_bulk(
+        self,
+        account_ids: List[int],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        複数アカウントのトレード履歴を並列に取得
+        
+        Args:
+            account_ids: アカウントIDのリスト
+            start_date: 開始日時（get_trades と同じ）
+            end_date: 終了日時（get_trades と同じ）
+        
+        Returns:
+            {アカウントID: トレード情報のリスト}（失敗した場合は例外をそのまま送出）
+        """
+        if not account_ids:
+            return {}
+        
+        # 全アカウントで同じ期間を使う
+        start_date, end_date = _resolve_window(start_date, end_date)
+        workers = min(self.FETCH_WORKERS, len(account_ids))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.get_trades, account_id, start_date, end_date): account_id
+                for account_id in account_ids
+            }
+            return {futures[future]: future.result() for future in as_completed(futures)}
+    
+    def iter_trades(
+        self,
+        account_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        window_days: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        トレード履歴を期間ごとに取得しながら1件ずつ返す
         
-        if start_date is None:
-            start_date = datetime.now(timezone.utc) - timedelta(days=30)
-        if end_date is None:
-            end_date = datetime.now(timezone.utc)
+        Args:
+            account_id: アカウントID
+            start_date: 開始日時（デフォルト: 30日前）
+            end_date: 終了日時（デフォルト: 現在）
+            window_days: 1回のリクエストで取得する日数（省略時は全期間を1回で取得）
         
-        # ISO 8601形式（Z形式）に変換
-        def to_iso_z(dt: datetime) -> str:
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        Yields:
+            トレード情報
+        """
+        start_date, end_date = _resolve_window(start_date, end_date)
+        
+        if not window_days:
+            yield from self._search_trades(account_id, start_date, end_date)
+            return
+        
+        # タイムゾーンなしの日時はUTCとして扱う（比較できるように揃える）
+        if start_date.tzinfo is None:
+            start_date = start_date.replace(tzinfo=timezone.utc)
+        if end_date.tzinfo is None:
+            end_date = end_date.replace(tzinfo=timezone.utc)
+        
+        # 期間を分割して取得（境界のトレードが両方の期間に含まれる場合があるのでIDで重複を除く）
+        step = timedelta(days=window_days)
+        seen_ids = set()
+        window_start = start_date
+        while window_start < end_date:
+            window_end = min(window_start + step, end_date)
+            for trade in self._search_trades(account_id, window_start, window_end):
+                trade_id = trade.get('id')
+                if trade_id in seen_ids:
+                    continue
+                seen_ids.add(trade_id)
+                yield trade
+            window_start = window_end
+    
+    def _search_trades(
+        self,
+        account_id: int,
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[Dict[str, Any]]:
+        """指定期間のトレードを1回のリクエストで取得"""
+        url = f"{self.BASE_URL}/Trade/search"
         
         payload = {
             "accountId": account_id,
-            "startTimestamp": to_iso_z(start_date),
-            "endTimestamp": to_iso_z(end_date)
+            "startTimestamp": _to_iso_z(start_date),
+            "endTimestamp": _to_iso_z(end_date)
         }
         
-        print(f"   [DEBUG] Trade search payload: {payload}")
+        logger.debug("Trade search payload: %s", payload)
         
-        response = self.session.post(
-            url,
-            json=payload,
-            headers={"Content-Type": "application/json"}
-        )
+        response = self._post(url, json_dumps_compact(payload))
         
-        # エラーの場合、詳細を表示
+        # エラーの場合、詳細を記録
         if not response.ok:
-            print(f"   [DEBUG] Response status: {response.status_code}")
-            print(f"   [DEBUG] Response body: {response.text}")
+            logger.debug("Response status: %s", response.status_code)
+            logger.debug("Response body: %s", response.text)
             response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         
         if data.get('success'):
             return data.get('trades', [])
@@ -169,7 +566,7 @@ class TopstepXClient:
     
     def get_positions(self, account_id: int) -> List[Dict[str, Any]]:
         """
-        現在のポジションを取得
+        現在のポジションを取得（CACHE_TTL["positions"] 秒間は前回の結果を返す）
         
         Args:
             account_id: アカウントID
@@ -177,20 +574,20 @@ class TopstepXClient:
         Returns:
             ポジション情報のリスト
         """
+        return self._cached("positions", account_id, lambda: self._fetch_positions(account_id))
+    
+    def _fetch_positions(self, account_id: int) -> List[Dict[str, Any]]:
+        """ポジションをAPIから取得"""
         url = f"{self.BASE_URL}/Position/search"
         
         payload = {
             "accountId": account_id
         }
         
-        response = self.session.post(
-            url,
-            json=payload,
-            headers={"Content-Type": "application/json"}
-        )
+        response = self._post(url, json_dumps_compact(payload))
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         
         if data.get('success'):
             return data.get('positions', [])
@@ -200,7 +597,7 @@ class TopstepXClient:
     
     def get_orders(self, account_id: int) -> List[Dict[str, Any]]:
         """
-        オープンオーダーを取得
+        オープンオーダーを取得（CACHE_TTL["orders"] 秒間は前回の結果を返す）
         
         Args:
             account_id: アカウントID
@@ -208,41 +605,99 @@ class TopstepXClient:
         Returns:
             オーダー情報のリスト
         """
+        return self._cached("orders", account_id, lambda: self._fetch_orders(account_id))
+    
+    def _fetch_orders(self, account_id: int) -> List[Dict[str, Any]]:
+        """オープンオーダーをAPIから取得"""
         url = f"{self.BASE_URL}/Order/search"
         
         payload = {
             "accountId": account_id
         }
         
-        response = self.session.post(
-            url,
-            json=payload,
-            headers={"Content-Type": "application/json"}
-        )
+        response = self._post(url, json_dumps_compact(payload))
         response.raise_for_status()
         
-        data = response.json()
+        data = json_loads(response.content)
         
         if data.get('success'):
             return data.get('orders', [])
         else:
             error_msg = data.get('errorMessage', '不明なエラー')
             raise Exception(f"オーダー取得失敗: {error_msg}")
+    
+    def fetch_all(
+        self,
+        account_ids: List[int],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict[int, Dict[str, List[Dict[str, Any]]]]:
+        """
+        複数アカウントのトレード・ポジション・オーダーを並列に取得
+        
+        Args:
+            account_ids: アカウントIDのリスト
+            start_date: トレード取得の開始日時（get_trades と同じ）
+            end_date: トレード取得の終了日時（get_trades と同じ）
+        
+        Returns:
+            {アカウントID: {"trades": [...], "positions": [...], "orders": [...]}}
+        """
+        result: Dict[int, Dict[str, List[Dict[str, Any]]]] = {}
+        if not account_ids:
+            return result
+        
+        # 全アカウントで同じ期間を使う
+        start_date, end_date = _resolve_window(start_date, end_date)
+        
+        # 応答待ちが大半なので、アカウント×種類の全リクエストを同時に投げる
+        workers = min(self.FETCH_WORKERS, len(account_ids) * 3)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for account_id in account_ids:
+                futures[account_id] = {
+                    "trades": executor.submit(self.get_trades, account_id, start_date, end_date),
+                    "positions": executor.submit(self.get_positions, account_id),
+                    "orders": executor.submit(self.get_orders, account_id),
+                }
+            
+            # 失敗したリクエストの例外はそのまま呼び出し元に伝える
+            for account_id, kinds in futures.items():
+                result[account_id] = {kind: future.result() for kind, future in kinds.items()}
+        
+        return result
+
+
+# format_trade の出力テンプレート（呼び出しごとに文字列を組み立て直さない）
+_format_trade_fields = (
+    "  ID: {}\n"
+    "  Contract: {}\n"
+    "  Side: {}\n"
+    "  Size: {}\n"
+    "  Price: {}\n"
+    "  P&L: {}\n"
+    "  Fees: ${:.2f}\n"
+    "  Time: {}\n"
+).format
 
 
 def format_trade(trade: Dict[str, Any]) -> str:
     """トレード情報を読みやすい形式でフォーマット"""
-    side = "BUY" if trade.get('side') == 0 else "SELL"
-    pnl = trade.get('profitAndLoss')
-    pnl_str = f"${pnl:.2f}" if pnl is not None else "ハーフターン"
+    get = trade.get
+    pnl = get('profitAndLoss')
     
-    return (
-        f"  ID: {trade.get('id')}\n"
-        f"  Contract: {trade.get('contractId')}\n"
-        f"  Side: {side}\n"
-        f"  Size: {trade.get('size')}\n"
-        f"  Price: {trade.get('price')}\n"
-        f"  P&L: {pnl_str}\n"
-        f"  Fees: ${trade.get('fees', 0):.2f}\n"
-        f"  Time: {trade.get('creationTimestamp')}\n"
-    )
\ No newline at end of file
+    return _format_trade_fields(
+        get('id'),
+        get('contractId'),
+        "BUY" if get('side') == 0 else "SELL",
+        get('size'),
+        get('price'),
+        f"${pnl:.2f}" if pnl is not None else "ハーフターン",
+        get('fees', 0),
+        get('creationTimestamp'),
+    )
+
+
+def format_trades(trades: List[Dict[str, Any]]) -> str:
+    """複数のトレードをまとめてフォーマット（トレードごとに空行で区切る）"""
+    return "\n".join(map(format_trade, trades))
\ No newline at end of file